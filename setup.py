@@ -21,6 +21,9 @@ setup(
         'fusesoc_generators',
         'vunit-hdl',
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
     dependency_links=[
         'git+https://github.com/benreynwar/fusesoc_generators@aef6f2ceac44ced285c0cce75b276495276cbf85#egg=fusesoc_generators-0.0.0',
     ],
@@ -0,0 +1,337 @@
+'''
+Columnar conversion of data files to and from NumPy structured arrays.
+
+Rather than decoding each line into a nested dictionary, all the lines are
+decoded at once.  Each port becomes a field of a structured array, records
+become nested structured fields and constrained arrays become sub-array
+fields.  A parallel structured array of booleans, with the same layout,
+marks the values that contained metavalues ('U', 'X', ...) and so could
+not be decoded.  Masked values are set to 0 (or None/'' for wide integers
+and enumerations).
+
+Encoding is the reverse.  The values can be given either as structured
+arrays or as dictionaries of arrays.  Ports that are missing are set to
+'U'.
+
+NumPy is an optional dependency of slvcodec and is only required by this
+module.
+'''
+
+import logging
+
+import numpy
+
+from slvcodec import typs, conversions
+
+
+logger = logging.getLogger(__name__)
+
+# Integers wider than this are decoded into object arrays of python ints.
+MAX_INTEGER_WIDTH = 63
+
+ZERO = ord('0')
+ONE = ord('1')
+UNDEFINED = ord('U')
+NEWLINE = ord('\n')
+
+
+def decode_bits(chars):
+    '''
+    Split an array of characters with shape (..., width) into an array of
+    which bits are '1' and an array of which values contain metavalues.
+    '''
+    is_one = chars == ONE
+    mask = ~numpy.all(is_one | (chars == ZERO), axis=-1)
+    return is_one, mask
+
+
+def has_field(values, name):
+    '''
+    Whether a structured array or dictionary has a field `name`.
+    '''
+    if isinstance(values, numpy.ndarray):
+        has = (values.dtype.names is not None) and (name in values.dtype.names)
+    else:
+        has = name in values
+    return has
+
+
+class IntegerColumn:
+    '''
+    A column for std_logic, std_logic_vector, unsigned and signed values.
+    '''
+
+    def __init__(self, width, is_signed):
+        self.width = width
+        self.is_signed = is_signed
+        if width > MAX_INTEGER_WIDTH:
+            self.dtype = numpy.dtype(object)
+        else:
+            self.dtype = numpy.dtype(numpy.int64)
+        self.mask_dtype = numpy.dtype(bool)
+
+    def decode(self, chars):
+        is_one, mask = decode_bits(chars)
+        if self.width > MAX_INTEGER_WIDTH:
+            values = numpy.empty(chars.shape[:-1], dtype=object)
+            flat_values = values.reshape(-1)
+            flat_chars = chars.reshape(-1, self.width)
+            for index, is_masked in enumerate(mask.reshape(-1)):
+                if is_masked:
+                    flat_values[index] = None
+                else:
+                    value = int(flat_chars[index].tobytes(), 2)
+                    if self.is_signed and value >= pow(2, self.width-1):
+                        value -= pow(2, self.width)
+                    flat_values[index] = value
+        else:
+            weights = numpy.left_shift(
+                1, numpy.arange(self.width-1, -1, -1, dtype=numpy.int64))
+            values = is_one.astype(numpy.int64) @ weights
+            if self.is_signed and self.width > 0:
+                # Sign extend without leaving int64, so that a width of
+                # MAX_INTEGER_WIDTH does not overflow.
+                half = numpy.int64(1 << (self.width-1))
+                values = (values ^ half) - half
+            values[mask] = 0
+        return values, mask
+
+    def encode(self, values):
+        if self.is_signed:
+            min_value = -pow(2, self.width-1)
+            max_value = pow(2, self.width-1)-1
+        else:
+            min_value = 0
+            max_value = pow(2, self.width)-1
+        if self.width > MAX_INTEGER_WIDTH:
+            values = numpy.asarray(values, dtype=object)
+            chars = numpy.empty(values.shape + (self.width,), dtype=numpy.uint8)
+            flat_chars = chars.reshape(-1, self.width)
+            for index, value in enumerate(values.reshape(-1)):
+                assert min_value <= value <= max_value
+                slv = conversions.uint_to_slv(value, self.width)
+                flat_chars[index] = numpy.frombuffer(slv.encode('ascii'), dtype=numpy.uint8)
+        else:
+            values = numpy.asarray(values, dtype=numpy.int64)
+            if values.size and ((values.min() < min_value) or (values.max() > max_value)):
+                raise ValueError('Values do not fit in {} bits.'.format(self.width))
+            shifts = numpy.arange(self.width-1, -1, -1, dtype=numpy.int64)
+            bits = numpy.right_shift(values[..., numpy.newaxis], shifts) & 1
+            chars = bits.astype(numpy.uint8) + ZERO
+        return chars
+
+
+class EnumerationColumn:
+    '''
+    A column of enumeration literals.  Codes that contain metavalues or
+    that do not correspond to a literal are masked.
+    '''
+
+    def __init__(self, typ):
+        self.width = typ.width
+        self.literals = numpy.array(typ.literals)
+        self.dtype = self.literals.dtype
+        self.mask_dtype = numpy.dtype(bool)
+        self.indices = IntegerColumn(width=self.width, is_signed=False)
+        order = numpy.argsort(self.literals)
+        self.sorted_literals = self.literals[order]
+        self.sorted_indices = order
+
+    def decode(self, chars):
+        indices, mask = self.indices.decode(chars)
+        mask |= indices >= len(self.literals)
+        values = self.literals[numpy.where(mask, 0, indices)]
+        values[mask] = ''
+        return values, mask
+
+    def encode(self, values):
+        lowered = numpy.char.lower(numpy.asarray(values, dtype=str))
+        indices = numpy.searchsorted(self.sorted_literals, lowered)
+        indices = numpy.minimum(indices, len(self.literals)-1)
+        unknown = self.sorted_literals[indices] != lowered
+        if numpy.any(unknown):
+            raise Exception('Enumeration does not contain {}. Options are {}'.format(
+                lowered[unknown][0], list(self.literals)))
+        return self.indices.encode(self.sorted_indices[indices])
+
+
+class ArrayColumn:
+    '''
+    A column for constrained arrays.  The first item in the array is in the
+    least significant bits.
+    '''
+
+    def __init__(self, item_column, size):
+        self.item_column = item_column
+        self.size = size
+        self.width = item_column.width * size
+        self.dtype = numpy.dtype((item_column.dtype, (size,)))
+        self.mask_dtype = numpy.dtype((item_column.mask_dtype, (size,)))
+
+    def decode(self, chars):
+        item_chars = chars.reshape(
+            chars.shape[:-1] + (self.size, self.item_column.width))[..., ::-1, :]
+        return self.item_column.decode(item_chars)
+
+    def encode(self, values):
+        item_chars = self.item_column.encode(values)
+        assert item_chars.shape[-2] == self.size
+        return item_chars[..., ::-1, :].reshape(item_chars.shape[:-2] + (self.width,))
+
+
+class RecordColumn:
+    '''
+    A column for records.  The first field is in the least significant
+    bits.  This is also used for the ports of an entity, in which case
+    `allow_missing` is True and missing ports are encoded as 'U'.
+    '''
+
+    def __init__(self, names_and_columns, allow_missing=False):
+        self.names_and_columns = names_and_columns
+        self.allow_missing = allow_missing
+        self.width = sum(column.width for name, column in names_and_columns)
+        self.dtype = numpy.dtype([
+            (name, column.dtype) for name, column in names_and_columns])
+        self.mask_dtype = numpy.dtype([
+            (name, column.mask_dtype) for name, column in names_and_columns])
+
+    def decode(self, chars):
+        shape = chars.shape[:-1]
+        values = numpy.zeros(shape, dtype=self.dtype)
+        mask = numpy.zeros(shape, dtype=self.mask_dtype)
+        stop = chars.shape[-1]
+        for name, column in self.names_and_columns:
+            start = stop - column.width
+            values[name], mask[name] = column.decode(chars[..., start: stop])
+            stop = start
+        return values, mask
+
+    def encode(self, values):
+        parts = []
+        shape = None
+        for name, column in self.names_and_columns:
+            if has_field(values, name):
+                part = column.encode(values[name])
+                shape = part.shape[:-1]
+            elif self.allow_missing:
+                part = None
+            else:
+                raise Exception('Missing field {}'.format(name))
+            parts.append((column, part))
+        if shape is None:
+            raise Exception('Cannot encode a record with no fields present.')
+        chars = numpy.empty(shape + (self.width,), dtype=numpy.uint8)
+        stop = self.width
+        for column, part in parts:
+            start = stop - column.width
+            if part is None:
+                chars[..., start: stop] = UNDEFINED
+            else:
+                chars[..., start: stop] = part
+            stop = start
+        return chars
+
+
+def make_column(typ, generics):
+    '''
+    Create a column to convert the type `typ` with the given generics.
+    '''
+    if isinstance(typ, typs.StdLogic):
+        column = IntegerColumn(width=1, is_signed=False)
+    elif isinstance(typ, typs.ConstrainedStdLogicVector):
+        width = typ.resolved_cache.resolve('width', typ.width, generics)
+        column = IntegerColumn(
+            width=width, is_signed=isinstance(typ, typs.ConstrainedSigned))
+    elif isinstance(typ, typs.Enumeration):
+        column = EnumerationColumn(typ)
+    elif isinstance(typ, typs.ConstrainedArray):
+        size = typ.resolved_cache.resolve('size', typ.size, generics)
+        item_column = make_column(typ.unconstrained_type.subtype, generics)
+        column = ArrayColumn(item_column=item_column, size=size)
+    elif isinstance(typ, typs.Record):
+        column = RecordColumn([
+            (name, make_column(subtype, generics))
+            for name, subtype in typ.names_and_subtypes])
+    else:
+        raise Exception('Cannot make a column for type {}'.format(typ))
+    return column
+
+
+def make_ports_column(layouts, generics):
+    '''
+    Create a column to convert the ports described by a list of
+    `entity.PortLayout`.
+    '''
+    column = RecordColumn(
+        [(layout.name, make_column(layout.typ, generics)) for layout in layouts],
+        allow_missing=True)
+    assert column.width == sum(layout.width for layout in layouts)
+    return column
+
+
+def lines_to_chars(lines, width):
+    '''
+    Convert an iterable of lines (str or bytes) into an array of characters
+    with shape (n_lines, width).  Blank lines are ignored.
+    '''
+    rows = [line.strip() for line in lines]
+    rows = [row for row in rows if row]
+    if rows and isinstance(rows[0], str):
+        joined = ''.join(rows).encode('ascii')
+    else:
+        joined = b''.join(rows)
+    if len(joined) != len(rows) * width:
+        raise ValueError('Expected all lines to have a width of {}.'.format(width))
+    chars = numpy.frombuffer(joined, dtype=numpy.uint8).reshape(len(rows), width)
+    return chars
+
+
+def columns_from_lines(column, lines):
+    '''
+    Decode lines with a column.  Returns a tuple of a structured array of the
+    values and a structured array of the metavalue mask.
+    '''
+    chars = lines_to_chars(lines, column.width)
+    return column.decode(chars)
+
+
+def columns_from_file(column, filename):
+    '''
+    Decode all the lines in a file with a column.
+    '''
+    with open(filename, 'rb') as f:
+        lines = f.read().split()
+    return columns_from_lines(column, lines)
+
+
+def chars_to_bytes(chars):
+    '''
+    Convert an array of characters with shape (n_lines, width) into the
+    contents of a data file.  Lines are separated by newlines.
+    '''
+    n_lines, width = chars.shape
+    with_newlines = numpy.empty((n_lines, width+1), dtype=numpy.uint8)
+    with_newlines[:, :width] = chars
+    with_newlines[:, width] = NEWLINE
+    return with_newlines.tobytes()[:-1]
+
+
+def columns_to_lines(column, values):
+    '''
+    Encode values with a column.  Returns a list of strings.
+    '''
+    chars = column.encode(values)
+    if len(chars) == 0:
+        lines = []
+    else:
+        lines = chars_to_bytes(chars).decode('ascii').split('\n')
+    return lines
+
+
+def columns_to_file(column, values, filename):
+    '''
+    Encode values with a column and write them to a file.
+    '''
+    chars = column.encode(values)
+    with open(filename, 'wb') as f:
+        f.write(chars_to_bytes(chars))
@@ -1,3 +1,18 @@
+import struct
+
+BINARY_CHARACTERS = frozenset('01')
+HEX_CHARACTERS = frozenset('0123456789abcdefABCDEF')
+
+# The struct formats used to unpack byte aligned integers, indexed by the
+# width and whether the integers are signed.
+STRUCT_FORMATS = {
+    (8, False): 'B', (8, True): 'b',
+    (16, False): 'H', (16, True): 'h',
+    (32, False): 'I', (32, True): 'i',
+    (64, False): 'Q', (64, True): 'q',
+    }
+
+
 def list_of_uints_to_uint(list_of_uints, width):
     '''
     Convert a list of unsigned integers into a single unsigned integer.
@@ -41,6 +56,28 @@ def uint_to_list_of_uints(uint, size, width):
     return output
 
 
+def uint_to_ints(uint, size, width, signed=False):
+    '''
+    Split an unsigned integer into a list of `size` integers that are each
+    `width` bits wide.  The first integer is in the least significant bits.
+    If `signed` is True the integers are two's complement.
+
+    Byte aligned widths are unpacked with `struct`, and other widths are
+    extracted with shifts and masks.
+    '''
+    struct_format = STRUCT_FORMATS.get((width, signed), None)
+    if struct_format is not None:
+        data = uint.to_bytes(size * width // 8, 'little')
+        ints = list(struct.unpack('<{}{}'.format(size, struct_format), data))
+    else:
+        mask = (1 << width) - 1
+        ints = [(uint >> shift) & mask for shift in range(0, size * width, width)]
+        if signed:
+            half = 1 << (width - 1)
+            ints = [i - (i & half) * 2 for i in ints]
+    return ints
+
+
 def sint_to_uint(sint, width):
     '''
     Convert a signed integer to an unsigned integer.
@@ -94,29 +131,87 @@ def uint_to_list_of_sints(uint, size, width):
 def slv_to_uint(slv):
     '''
     Convert a string of '0' and '1' to an unsigned integer.
+    If the string contains metavalues ('U', 'X', 'Z', '-', ...) then
+    None is returned.
     '''
-    total = 0
-    f = 1
-    for ch in reversed(slv):
-        if ch not in ('0', '1'):
-            total = None
-        if total is not None:
-            if ch == '1':
-                total += f
-            f *= 2
+    if not BINARY_CHARACTERS.issuperset(slv):
+        total = None
+    elif slv:
+        total = int(slv, 2)
+    else:
+        total = 0
     return total
 
 
 def uint_to_slv(uint, width):
     '''
     Convert an unsigned integer to a string of '0' and '1'.
+    Only the lowest `width` bits of the integer are used.
     '''
     if uint is None:
         slv = 'U' * width
+    elif width == 0:
+        slv = ''
     else:
-        bits = []
-        for w in range(width):
-            bits.append('1' if uint % 2 else '0')
-            uint //= 2
-        slv = ''.join(reversed(bits))
+        slv = format(uint & ((1 << width) - 1), '0{}b'.format(width))
     return slv
+
+
+def slv_to_hex(slv):
+    '''
+    Convert a string of std_logic characters to the hex line format.
+
+    Each group of four bits becomes a hex digit.  A group that is all the
+    same metavalue becomes that metavalue character, and any other group
+    becomes '#' followed by its four characters.  The leftmost group is
+    padded with copies of the leftmost character.
+    '''
+    n_nibbles = (len(slv) + 3) // 4
+    if not slv:
+        hex_string = ''
+    elif BINARY_CHARACTERS.issuperset(slv):
+        hex_string = format(int(slv, 2), '0{}X'.format(n_nibbles))
+    else:
+        padded = slv[0] * (4 * n_nibbles - len(slv)) + slv
+        pieces = []
+        for index in range(0, len(padded), 4):
+            nibble = padded[index: index+4]
+            if BINARY_CHARACTERS.issuperset(nibble):
+                pieces.append(format(int(nibble, 2), 'X'))
+            elif nibble == nibble[0] * 4:
+                pieces.append(nibble[0])
+            else:
+                pieces.append('#' + nibble)
+        hex_string = ''.join(pieces)
+    return hex_string
+
+
+def hex_to_slv(hex_string, width):
+    '''
+    Convert a string in the hex line format (see `slv_to_hex`) to a string
+    of std_logic characters of length `width`.
+    '''
+    n_nibbles = (width + 3) // 4
+    if not hex_string:
+        slv = ''
+    elif HEX_CHARACTERS.issuperset(hex_string):
+        slv = format(int(hex_string, 16), '0{}b'.format(4 * len(hex_string)))
+    else:
+        pieces = []
+        index = 0
+        while index < len(hex_string):
+            c = hex_string[index]
+            if c == '#':
+                pieces.append(hex_string[index+1: index+5])
+                index += 5
+            elif c in HEX_CHARACTERS:
+                pieces.append(format(int(c, 16), '04b'))
+                index += 1
+            else:
+                pieces.append(c * 4)
+                index += 1
+        slv = ''.join(pieces)
+    if len(slv) != 4 * n_nibbles:
+        raise ValueError('Hex line {} does not have a width of {}.'.format(
+            hex_string, width))
+    return slv[len(slv)-width:]
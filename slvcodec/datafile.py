@@ -0,0 +1,156 @@
+'''
+Memory-mapped access to the lines of data files (indata.dat and outdata.dat).
+
+A `DataFile` is a sequence of the lines in a file.  Any line can be read
+without reading the lines before it, and slicing returns a view that shares
+the same memory map so that windows of very long simulations can be
+inspected without loading the whole file.
+
+When every line has the same known width the position of each line is
+calculated directly.  Otherwise (e.g. the hex line format, where escaped
+metavalues change the length of a line) the files are scanned once to
+build an index of where each line starts.
+'''
+
+import array
+import collections.abc
+import copy
+import mmap
+import os
+
+
+NEWLINE = ord('\n')
+
+# The number of bytes that are copied at a time when counting newlines.
+COUNT_CHUNK_SIZE = 1 << 20
+
+
+def count_newlines(data, size, chunk_size=COUNT_CHUNK_SIZE):
+    '''
+    Count the newlines in `data` a chunk at a time, so that a memory map
+    is never copied all at once.
+    '''
+    return sum(data[start: start+chunk_size].count(b'\n')
+               for start in range(0, size, chunk_size))
+
+
+def count_fixed_width_lines(data, size, width):
+    '''
+    Returns the number of lines in `data` if every line is
+    `width` characters long, otherwise returns None.  The last line may or
+    may not be followed by a newline.
+    '''
+    line_size = width + 1
+    if size % line_size == 0:
+        n_lines = size // line_size
+    elif size % line_size == width:
+        n_lines = size // line_size + 1
+    else:
+        return None
+    # Every separator must be a newline and there must be no other
+    # newlines in the file.
+    separators = data[width: size: line_size]
+    if separators.count(b'\n') != len(separators):
+        return None
+    if count_newlines(data, size) != len(separators):
+        return None
+    return n_lines
+
+
+def index_lines(data, size):
+    '''
+    Find the position that each line starts at.
+    '''
+    starts = array.array('q')
+    position = 0
+    while position < size:
+        starts.append(position)
+        newline = data.find(b'\n', position)
+        if newline < 0:
+            break
+        position = newline + 1
+    return starts
+
+
+class DataFile(collections.abc.Sequence):
+    '''
+    A memory-mapped sequence of the lines in a data file.
+
+    Args:
+      `filename`: The file to read.
+      `width`: Optional.  The width of every line.  If it is not given,
+         or the file does not match it, the lines are indexed instead.
+      `decode`: Optional.  A function that is applied to each line when it
+         is accessed (e.g. from `entity.EntityCodec.line_decoder`).  By
+         default lines are returned as strings without the newline.
+    '''
+
+    def __init__(self, filename, width=None, decode=None):
+        with open(filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = b''
+        self.filename = filename
+        self.size = size
+        self.decode = decode
+        self._data = data
+        n_lines = None
+        if width is not None:
+            n_lines = count_fixed_width_lines(data, size, width)
+        if n_lines is None:
+            self.width = None
+            self._starts = index_lines(data, size)
+            n_lines = len(self._starts)
+        else:
+            self.width = width
+            self._starts = None
+        self._lines = range(n_lines)
+
+    def _bounds(self, line_index):
+        if self._starts is None:
+            start = line_index * (self.width + 1)
+            stop = start + self.width
+        else:
+            start = self._starts[line_index]
+            if line_index + 1 < len(self._starts):
+                stop = self._starts[line_index + 1] - 1
+            elif self._data[self.size-1] == NEWLINE:
+                stop = self.size - 1
+            else:
+                stop = self.size
+        return start, stop
+
+    def line(self, index):
+        '''
+        The line at `index` as a string, without applying `decode`.
+        '''
+        start, stop = self._bounds(self._lines[index])
+        return self._data[start: stop].decode('ascii')
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            view = copy.copy(self)
+            view._lines = self._lines[index]
+            return view
+        line = self.line(index)
+        if self.decode is not None:
+            line = self.decode(line)
+        return line
+
+    def close(self):
+        '''
+        Close the memory map.  This also closes any views of the file.
+        '''
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
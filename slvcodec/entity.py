@@ -1,16 +1,30 @@
 import collections
+import collections.abc
+import concurrent.futures
+import functools
+import itertools
 import logging
+import os
 
-from slvcodec import package, typ_parser, symbolic_math, typs
+from slvcodec import package, typ_parser, typs, conversions, datafile
 from slvcodec.typs import ResolutionError
+from slvcodec.slotted import Slotted
 
 
 logger = logging.getLogger(__name__)
 
 CLOCK_NAMES = ('clk', 'clock')
 
+# The number of lines sent to a worker at a time when lines are decoded
+# with a pool of processes.
+DECODE_CHUNK_SIZE = 10000
 
-def process_files(filenames, must_resolve=True):
+# When a data file is decoded with a pool of processes it is split into
+# this many byte ranges per worker.
+SHARDS_PER_WORKER = 4
+
+
+def process_files(filenames, must_resolve=True, n_workers=1):
     '''
     Takes a list of filenames,
     parses them with the VUnit parser
@@ -19,11 +33,21 @@ def process_files(filenames, must_resolve=True):
     The packages references to one another are resolved as
     are the references to types and constants in the entity
     interfaces.
+
+    The files are parsed with a pool of `n_workers` processes.
+    '''
+    parsed_files = package.parsed_from_filenames(filenames, n_workers=n_workers)
+    return process_parsed_files(parsed_files, must_resolve=must_resolve)
+
+
+def process_parsed_files(parsed_files, must_resolve=True):
+    '''
+    Like `process_files` but takes a list of files that have already been
+    parsed.
     '''
     entities = {}
     packages = []
-    for filename in filenames:
-        parsed = package.parsed_from_filename(filename)
+    for parsed in parsed_files:
         if parsed.entities:
             assert(len(parsed.entities) == 1)
             p = process_parsed_entity(parsed)
@@ -66,7 +90,9 @@ def process_parsed_entity(parsed_entity):
     return p
 
 
-class Port:
+class Port(Slotted):
+
+    __slots__ = ('name', 'direction', 'typ')
 
     def __init__(self, name, direction, typ):
         self.name = name
@@ -130,6 +156,7 @@ class Entity(object):
         self.generics = generics
         self.ports = ports
         self.uses = uses
+        self._codecs = {}
 
     def __str__(self):
         return 'Entity({})'.format(self.identifier)
@@ -137,44 +164,422 @@ class Entity(object):
     def __repr__(self):
         return str(self)
 
+    def codec(self, generics):
+        '''
+        Get the `EntityCodec` for this entity with the given generics.
+        Codecs are created once for each set of generics and then reused.
+        '''
+        key = typs.freeze_generics(generics)
+        codec = self._codecs.get(key, None)
+        if codec is None:
+            codec = EntityCodec(self, generics)
+            self._codecs[key] = codec
+        return codec
+
     def inputs_to_slv(self, inputs, generics):
-        slvs = [] 
-        for port in self.ports.values():
-            if (port.direction == 'in') and (port.name not in CLOCK_NAMES):
-                d = inputs.get(port.name, None)
-                if d is None:
-                    w = typs.make_substitute_generics_function(generics)(port.typ.width)
-                    o = 'U' * symbolic_math.get_value(w)
-                else:
-                    o = port.typ.to_slv(d, generics)
-                slvs.append(o)
-        slv = ''.join(reversed(slvs))
-        return slv
+        return self.codec(generics).inputs_to_slv(inputs)
 
-    def ports_from_slv(self, slv, generics, direction):
-        pos = 0
-        outputs = {}
-        for port in self.ports.values():
-            if (port.direction == direction) and (port.name not in CLOCK_NAMES):
-                w = typs.make_substitute_generics_function(generics)(port.typ.width)
-                width = symbolic_math.get_value(w)
-                intwidth = int(width)
-                assert(width == intwidth)
-                if pos == 0:
-                    piece = slv[-intwidth:]
-                else:
-                    piece = slv[-pos-intwidth: -pos]
-                pos += intwidth
-                o = port.typ.from_slv(piece, generics)
-                outputs[port.name] = o
-        return outputs
+    def ports_from_slv(self, slv, generics, direction, lazy=False):
+        '''
+        Decode the ports with direction `direction`.  If `lazy` is True a
+        `LazyPorts` mapping is returned that only decodes a port when it
+        is accessed.
+        '''
+        return self.codec(generics).ports_from_slv(slv, direction, lazy=lazy)
 
-    def outputs_from_slv(self, slv, generics):
+    def outputs_from_slv(self, slv, generics, lazy=False):
         slv = slv.strip()
-        data = self.ports_from_slv(slv, generics, 'out')
+        data = self.ports_from_slv(slv, generics, 'out', lazy=lazy)
         return data
 
-    def inputs_from_slv(self, slv, generics):
+    def inputs_from_slv(self, slv, generics, lazy=False):
         slv = slv.strip()
-        data = self.ports_from_slv(slv, generics, 'in')
+        data = self.ports_from_slv(slv, generics, 'in', lazy=lazy)
         return data
+
+    def inputs_to_hex(self, inputs, generics):
+        '''
+        Convert the inputs to a line in the hex line format used by
+        ReadHexFile (see `conversions.slv_to_hex`).
+        '''
+        return conversions.slv_to_hex(self.inputs_to_slv(inputs, generics))
+
+    def ports_from_hex(self, line, generics, direction, lazy=False):
+        codec = self.codec(generics)
+        slv = conversions.hex_to_slv(line.strip(), codec.widths[direction])
+        return codec.ports_from_slv(slv, direction, lazy=lazy)
+
+    def outputs_from_hex(self, line, generics, lazy=False):
+        return self.ports_from_hex(line, generics, 'out', lazy=lazy)
+
+    def inputs_from_hex(self, line, generics, lazy=False):
+        return self.ports_from_hex(line, generics, 'in', lazy=lazy)
+
+    def ports_from_lines(self, lines, generics, direction, hex_format=False, n_workers=1,
+                         lazy=False):
+        '''
+        Decode many lines of a data file in one call.
+        `lines` is either an iterable of lines or the name of a data file.
+        If `hex_format` is True the lines are in the hex line format.
+        If `n_workers` is greater than 1 the lines are decoded in chunks by a
+        pool of processes.  A data file is split into byte ranges which the
+        workers read themselves, so the lines are never sent between
+        processes.
+        If `lazy` is True each line becomes a `LazyPorts` mapping.  These
+        are cheap to create so `n_workers` is ignored.
+        Returns a list of dictionaries of port values.
+        '''
+        codec = self.codec(generics)
+        if lazy:
+            if isinstance(lines, str):
+                with open(lines, 'r') as f:
+                    data = codec.ports_from_lines(f, direction, hex_format=hex_format, lazy=True)
+            else:
+                data = codec.ports_from_lines(lines, direction, hex_format=hex_format, lazy=True)
+        elif isinstance(lines, str) and (n_workers > 1):
+            data = []
+            ranges = byte_ranges(os.path.getsize(lines), n_workers * SHARDS_PER_WORKER)
+            decode_range = functools.partial(
+                _decode_byte_range, direction, hex_format, lines)
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=n_workers, initializer=_initialize_worker,
+                    initargs=(codec,)) as executor:
+                for range_data in executor.map(decode_range, *zip(*ranges)):
+                    data += range_data
+        elif isinstance(lines, str):
+            with open(lines, 'r') as f:
+                data = codec.ports_from_lines(f, direction, hex_format=hex_format)
+        elif n_workers > 1:
+            data = []
+            decode_chunk = functools.partial(_decode_chunk, direction, hex_format)
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=n_workers, initializer=_initialize_worker,
+                    initargs=(codec,)) as executor:
+                for chunk_data in executor.map(decode_chunk, chunked(lines, DECODE_CHUNK_SIZE)):
+                    data += chunk_data
+        else:
+            data = codec.ports_from_lines(lines, direction, hex_format=hex_format)
+        return data
+
+    def outputs_from_lines(self, lines, generics, hex_format=False, n_workers=1, lazy=False):
+        return self.ports_from_lines(lines, generics, 'out', hex_format=hex_format,
+                                     n_workers=n_workers, lazy=lazy)
+
+    def inputs_from_lines(self, lines, generics, hex_format=False, n_workers=1, lazy=False):
+        return self.ports_from_lines(lines, generics, 'in', hex_format=hex_format,
+                                     n_workers=n_workers, lazy=lazy)
+
+    def open_datafile(self, filename, generics, direction, hex_format=False, lazy=False):
+        '''
+        Memory map a data file.  Returns a `datafile.DataFile`, a sequence
+        that decodes each line when it is accessed.  If `lazy` is True the
+        lines are decoded into `LazyPorts` mappings.
+        '''
+        codec = self.codec(generics)
+        if hex_format:
+            width = None
+        else:
+            width = codec.widths[direction]
+        return datafile.DataFile(
+            filename, width=width,
+            decode=codec.line_decoder(direction, hex_format=hex_format, lazy=lazy))
+
+    def open_outputs(self, filename, generics, hex_format=False, lazy=False):
+        return self.open_datafile(filename, generics, 'out', hex_format=hex_format, lazy=lazy)
+
+    def open_inputs(self, filename, generics, hex_format=False, lazy=False):
+        return self.open_datafile(filename, generics, 'in', hex_format=hex_format, lazy=lazy)
+
+    def columns_from_lines(self, lines, generics, direction='out'):
+        '''
+        Decode many lines at once into NumPy structured arrays.
+        Returns a tuple of (values, mask) where `mask` marks the values
+        that contained metavalues.  See `slvcodec.columnar`.
+        '''
+        from slvcodec import columnar
+        column = self.codec(generics).column(direction)
+        return columnar.columns_from_lines(column, lines)
+
+    def columns_from_file(self, filename, generics, direction='out'):
+        '''
+        Decode a whole data file (e.g. outdata.dat) into NumPy structured
+        arrays.  See `columns_from_lines`.
+        '''
+        from slvcodec import columnar
+        column = self.codec(generics).column(direction)
+        return columnar.columns_from_file(column, filename)
+
+    def columns_to_lines(self, values, generics, direction='in'):
+        '''
+        Encode NumPy arrays into lines in a single vectorized pass.
+        `values` is a structured array or a dictionary of arrays, with one
+        item per line.  Ports that are missing are set to 'U'.
+        '''
+        from slvcodec import columnar
+        column = self.codec(generics).column(direction)
+        return columnar.columns_to_lines(column, values)
+
+    def columns_to_file(self, values, filename, generics, direction='in'):
+        '''
+        Encode NumPy arrays and write them to a data file (e.g. indata.dat).
+        See `columns_to_lines`.
+        '''
+        from slvcodec import columnar
+        column = self.codec(generics).column(direction)
+        columnar.columns_to_file(column, values, filename)
+
+
+class PortLayout(Slotted):
+    '''
+    The position of a port within the std_logic_vector of all the ports
+    with the same direction.  `start` and `stop` slice the port out of
+    that std_logic_vector and `offset` is the number of bits below the
+    port.
+    '''
+
+    __slots__ = ('name', 'typ', 'width', 'start', 'stop', 'offset')
+
+    def __init__(self, name, typ, width, start, stop, offset):
+        self.name = name
+        self.typ = typ
+        self.width = width
+        self.start = start
+        self.stop = stop
+        self.offset = offset
+
+
+def make_port_layouts(ports, generics, direction):
+    '''
+    Resolve the widths of the ports with direction `direction` (excluding
+    clocks) and work out where each one is placed in the std_logic_vector.
+    The first port occupies the least significant bits.
+    '''
+    layouts = []
+    pos = 0
+    for port in ports.values():
+        if (port.direction == direction) and (port.name not in CLOCK_NAMES):
+            width = typs.apply_generics(generics, port.typ.width)
+            intwidth = int(width)
+            assert(width == intwidth)
+            if pos == 0:
+                stop = None
+            else:
+                stop = -pos
+            layouts.append(PortLayout(
+                name=port.name, typ=port.typ, width=intwidth,
+                start=-pos-intwidth, stop=stop, offset=pos))
+            pos += intwidth
+    return layouts
+
+
+class EntityCodec:
+    '''
+    Converts the ports of an entity to and from std_logic_vector for a
+    particular set of generics.
+
+    The widths and positions of the ports are resolved when the codec is
+    created so that converting each line of a data file only costs the
+    conversion of each port.
+    '''
+
+    def __init__(self, entity, generics):
+        self.generics = typs.FrozenGenerics(generics)
+        self.layouts = {
+            'in': make_port_layouts(entity.ports, generics, 'in'),
+            'out': make_port_layouts(entity.ports, generics, 'out'),
+            }
+        self.widths = dict([
+            (direction, sum(layout.width for layout in layouts))
+            for direction, layouts in self.layouts.items()])
+        self.input_defaults = [
+            'U' * layout.width for layout in self.layouts['in']]
+        # The decoding method and offset of each port, used by `LazyPorts`.
+        self.port_decoders = dict([
+            (direction, collections.OrderedDict([
+                (layout.name, (layout.typ.decode_slv, layout.offset)) for layout in layouts]))
+            for direction, layouts in self.layouts.items()])
+        self.columns = {}
+
+    def column(self, direction):
+        '''
+        Get a `columnar.RecordColumn` to convert the ports with direction
+        `direction` to and from NumPy arrays.
+        '''
+        if direction not in self.columns:
+            from slvcodec import columnar
+            self.columns[direction] = columnar.make_ports_column(
+                self.layouts[direction], self.generics)
+        return self.columns[direction]
+
+    def inputs_to_slv(self, inputs):
+        generics = self.generics
+        slvs = []
+        for layout, default in zip(self.layouts['in'], self.input_defaults):
+            d = inputs.get(layout.name, None)
+            if d is None:
+                o = default
+            else:
+                o = layout.typ.to_slv(d, generics)
+            slvs.append(o)
+        slv = ''.join(reversed(slvs))
+        return slv
+
+    def check_width(self, slv, direction):
+        '''
+        Raise a ValueError if `slv` is not as wide as the ports with
+        direction `direction`.
+        '''
+        width = self.widths[direction]
+        if len(slv) != width:
+            raise ValueError('Expected a std_logic_vector of width {} but got width {}.'.format(
+                width, len(slv)))
+
+    def ports_from_slv(self, slv, direction, lazy=False):
+        generics = self.generics
+        self.check_width(slv, direction)
+        if lazy:
+            data = LazyPorts(slv, generics, self.port_decoders[direction])
+        else:
+            n_bits = len(slv)
+            data = {}
+            for layout in self.layouts[direction]:
+                data[layout.name], start = layout.typ.decode_slv(
+                    slv, n_bits - layout.offset, generics)
+        return data
+
+    def line_decoder(self, direction, hex_format=False, lazy=False):
+        '''
+        Make a function that decodes a line of a data file.  The port
+        positions and conversion methods are looked up once rather than
+        for every line.  If `lazy` is True the function returns a
+        `LazyPorts` mapping.
+        '''
+        generics = self.generics
+        width = self.widths[direction]
+        port_decoders = self.port_decoders[direction]
+        check_width = self.check_width
+        fields = [(name, decode_slv, offset)
+                  for name, (decode_slv, offset) in port_decoders.items()]
+
+        def decode(line):
+            slv = line.strip()
+            if hex_format:
+                slv = conversions.hex_to_slv(slv, width)
+            check_width(slv, direction)
+            if lazy:
+                data = LazyPorts(slv, generics, port_decoders)
+            else:
+                n_bits = len(slv)
+                data = dict([(name, decode_slv(slv, n_bits - offset, generics)[0])
+                             for name, decode_slv, offset in fields])
+            return data
+        return decode
+
+    def ports_from_lines(self, lines, direction, hex_format=False, lazy=False):
+        decode = self.line_decoder(direction, hex_format=hex_format, lazy=lazy)
+        return [decode(line) for line in lines]
+
+
+class LazyPorts(Slotted, collections.abc.Mapping):
+    '''
+    A read-only mapping from port names to values that keeps the
+    std_logic_vector of a line and only decodes a port when it is first
+    accessed.  Decoded values are cached.  It compares equal to a
+    dictionary of the same port values, so it can be used in place of the
+    dictionaries returned by `EntityCodec.ports_from_slv`.
+
+    Args:
+      `slv`: The std_logic_vector of all the ports.
+      `generics`: The generics used to decode the ports.
+      `port_decoders`: An ordered dictionary mapping each port name to the
+         `decode_slv` method of its type and the offset of its least
+         significant bit from the end of `slv`.
+    '''
+
+    __slots__ = ('slv', 'generics', 'port_decoders', '_decoded')
+
+    def __init__(self, slv, generics, port_decoders):
+        self.slv = slv
+        self.generics = generics
+        self.port_decoders = port_decoders
+        self._decoded = {}
+
+    def __getitem__(self, name):
+        if name in self._decoded:
+            value = self._decoded[name]
+        else:
+            decode_slv, offset = self.port_decoders[name]
+            value, start = decode_slv(self.slv, len(self.slv) - offset, self.generics)
+            self._decoded[name] = value
+        return value
+
+    def __iter__(self):
+        return iter(self.port_decoders)
+
+    def __len__(self):
+        return len(self.port_decoders)
+
+    def __repr__(self):
+        return 'LazyPorts({})'.format(dict(self))
+
+
+def chunked(iterable, chunk_size):
+    '''
+    Split an iterable into lists of length `chunk_size`.  The last list
+    may be shorter.
+    '''
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+# The codec used by a worker process.  It is sent once when the worker
+# starts rather than with every chunk of lines.
+_worker_codec = None
+
+
+def _initialize_worker(codec):
+    global _worker_codec
+    _worker_codec = codec
+
+
+def _decode_chunk(direction, hex_format, lines):
+    return _worker_codec.ports_from_lines(lines, direction, hex_format=hex_format)
+
+
+def byte_ranges(size, n_ranges):
+    '''
+    Split `size` bytes into at most `n_ranges` (start, stop) ranges of
+    similar length.
+    '''
+    n_ranges = max(1, min(n_ranges, size))
+    bounds = [size * index // n_ranges for index in range(n_ranges + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def read_byte_range(filename, start, stop):
+    '''
+    Read the lines of a file that start within the bytes [start, stop).
+    Splitting a file into consecutive byte ranges and reading each with
+    this function returns every line exactly once.
+    '''
+    lines = []
+    with open(filename, 'rb') as f:
+        if start > 0:
+            # Skip the rest of the line that started before this range.
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < stop:
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line.decode('ascii'))
+    return lines
+
+
+def _decode_byte_range(direction, hex_format, filename, start, stop):
+    lines = read_byte_range(filename, start, stop)
+    return _worker_codec.ports_from_lines(lines, direction, hex_format=hex_format)
@@ -1,19 +1,75 @@
+import functools
+import hashlib
+import json
 import logging
 import os
 
-import jinja2
-
-from slvcodec import entity, package, typs, package_generator, config
+from slvcodec import entity, package, typs, package_generator, config, params_helper
 
 logger = logging.getLogger(__name__)
 
+# The file in which `add_slvcodec_files` records a hash of its inputs and
+# the files it generated.
+MANIFEST_FILENAME = 'slvcodec_files.json'
+
 
-def make_filetestbench(enty):
+def write_if_changed(filename, content):
+    '''
+    Write `content` to a file unless the file already contains exactly that.
+    Unchanged files keep their modification times so that simulators do not
+    recompile them.
+    Returns whether the file was written.
+    '''
+    if os.path.exists(filename):
+        with open(filename, 'r') as f:
+            if f.read() == content:
+                return False
+    with open(filename, 'w') as f:
+        f.write(content)
+    return True
+
+
+@functools.lru_cache()
+def slvcodec_hash():
+    '''
+    A hash of the slvcodec source code, templates and VHDL helper files.
+    Generated files depend on all of these.
+    '''
+    h = hashlib.sha1()
+    for dirpath, dirnames, filenames in os.walk(config.basedir):
+        # Sorting in place makes the walk visit directories in a fixed order.
+        dirnames.sort()
+        for fn in sorted(filenames):
+            if os.path.splitext(fn)[1] in ('.py', '.vhd'):
+                h.update(fn.encode())
+                with open(os.path.join(dirpath, fn), 'rb') as f:
+                    h.update(f.read())
+    return h.hexdigest()
+
+
+def inputs_hash(filenames, params=None):
+    '''
+    A hash of everything that files generated from `filenames` depend upon:
+    the names and contents of the files, the slvcodec source and `params`.
+    '''
+    h = hashlib.sha1()
+    h.update(slvcodec_hash().encode())
+    for fn in filenames:
+        h.update(fn.encode())
+        with open(fn, 'rb') as f:
+            h.update(f.read())
+    h.update(str(params_helper.make_constant_hashable(params)).encode())
+    return h.hexdigest()
+
+
+def make_filetestbench(enty, hex_format=False):
     '''
     Generate a testbench that reads inputs from a file, and writes outputs to
     a file.
     Args:
       `enty`: A resolved entity object parsed from the VHDL.
+      `hex_format`: Whether the files use the hex line format rather than
+         one character per bit.
     '''
     # Generate a record type for the entity inputs (excluding clock).
     inputs = [p for p in enty.ports.values()
@@ -56,11 +112,13 @@ def make_filetestbench(enty):
                               for p in enty.ports.values() if p.name not in clk_names])
     dut_generics = ',\n'.join(['{} => {}'.format(g.name, g.name)
                                for g in enty.generics.values()])
-    # Read in the testbench template and format it.
-    template_fn = os.path.join(os.path.dirname(__file__), 'templates',
-                               'file_testbench.vhd')
-    with open(template_fn, 'r') as f:
-        filetestbench_template = jinja2.Template(f.read())
+    if hex_format:
+        reader_name, writer_name = 'ReadHexFile', 'WriteHexFile'
+    else:
+        reader_name, writer_name = 'ReadFile', 'WriteFile'
+    # Format the testbench template.
+    filetestbench_template = package_generator.get_template_environment().get_template(
+        'file_testbench.vhd')
     filetestbench = filetestbench_template.render(
         test_name='{}_tb'.format(enty.identifier),
         use_clauses=use_clauses,
@@ -70,29 +128,33 @@ def make_filetestbench(enty):
         dut_name=enty.identifier,
         clk_connections=clk_connections,
         connections=connections,
+        reader_name=reader_name,
+        writer_name=writer_name,
         )
     return filetestbench
 
 
-def prepare_files(directory, filenames, top_entity):
+def prepare_files(directory, filenames, top_entity, hex_format=False, n_workers=1):
     '''
     Parses VHDL files, and generates a testbench for `top_entity`.
     Returns a tuple of a list of testbench files, and a dictionary
     of parsed objects.
+    If `hex_format` is True the testbench reads and writes files in the hex
+    line format.
+    The files are parsed with a pool of `n_workers` processes.
     '''
-    entities, packages = entity.process_files(filenames)
+    entities, packages = entity.process_files(filenames, n_workers=n_workers)
     resolved_entity = entities[top_entity]
-    new_fns = [
-        os.path.join(config.vhdldir, 'read_file.vhd'),
-        os.path.join(config.vhdldir, 'write_file.vhd'),
-        os.path.join(config.vhdldir, 'clock.vhd'),
-    ]
+    if hex_format:
+        file_fns = ['read_hex_file.vhd', 'write_hex_file.vhd']
+    else:
+        file_fns = ['read_file.vhd', 'write_file.vhd']
+    new_fns = [os.path.join(config.vhdldir, fn) for fn in file_fns + ['clock.vhd']]
     # Make file testbench
-    ftb = make_filetestbench(resolved_entity)
+    ftb = make_filetestbench(resolved_entity, hex_format=hex_format)
     ftb_fn = os.path.join(directory, '{}_tb.vhd'.format(
         resolved_entity.identifier))
-    with open(ftb_fn, 'w') as f:
-        f.write(ftb)
+    write_if_changed(ftb_fn, ftb)
     new_fns.append(ftb_fn)
     resolved = {
         'entities': entities,
@@ -101,16 +163,30 @@ def prepare_files(directory, filenames, top_entity):
     return new_fns, resolved
 
 
-def add_slvcodec_files(directory, filenames):
+def add_slvcodec_files(directory, filenames, n_workers=1):
     '''
     Parses files, and generates helper packages for existing packages that
     contain functions to convert types to and from std_logic_vector.
+    The files are parsed with a pool of `n_workers` processes.
+
+    Generation is incremental.  If none of the inputs have changed since
+    the last call with the same `directory` nothing is parsed or generated,
+    and generated files are only rewritten if their contents change.
     '''
-    entities, packages = entity.process_files(filenames, must_resolve=False)
+    manifest_filename = os.path.join(directory, MANIFEST_FILENAME)
+    h = inputs_hash(filenames)
+    if os.path.exists(manifest_filename):
+        with open(manifest_filename, 'r') as f:
+            manifest = json.load(f)
+        if (manifest['hash'] == h) and all(
+                os.path.exists(fn) for fn in manifest['filenames']):
+            logger.debug('Reusing slvcodec files in {}'.format(directory))
+            return manifest['filenames']
+    parsed_files = package.parsed_from_filenames(filenames, n_workers=n_workers)
+    entities, packages = entity.process_parsed_files(parsed_files, must_resolve=False)
     combined_filenames = [os.path.join(config.vhdldir, 'txt_util.vhd'),
                           os.path.join(config.vhdldir, 'slvcodec.vhd')]
-    for fn in filenames:
-        parsed = package.parsed_from_filename(fn)
+    for fn, parsed in zip(filenames, parsed_files):
         if fn not in combined_filenames:
             combined_filenames.append(fn)
         if parsed.packages and fn[-len('slvcodec.vhd'):] != 'slvcodec.vhd':
@@ -118,7 +194,8 @@ def add_slvcodec_files(directory, filenames):
             slvcodec_pkg = package_generator.make_slvcodec_package(packages[package_name])
             slvcodec_package_filename = os.path.join(
                 directory, '{}_slvcodec.vhd'.format(package_name))
-            with open(slvcodec_package_filename, 'w') as f:
-                f.write(slvcodec_pkg)
+            write_if_changed(slvcodec_package_filename, slvcodec_pkg)
             combined_filenames.append(slvcodec_package_filename)
+    with open(manifest_filename, 'w') as f:
+        json.dump({'hash': h, 'filenames': combined_filenames}, f)
     return combined_filenames
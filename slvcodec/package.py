@@ -1,6 +1,11 @@
+import collections
+import concurrent.futures
 import logging
 
+from vunit.database import DataBase, PickledDataBase
+
 from slvcodec import symbolic_math, typs, typ_parser, vhdl_parser
+from slvcodec.slotted import Slotted
 
 
 logger = logging.getLogger(__name__)
@@ -19,6 +24,17 @@ def get_types(p):
     return types
 
 
+def use_parse_cache(directory):
+    '''
+    Keep a persistent cache of parsed VHDL files in `directory` so that
+    files that have not changed are not parsed again, even by another
+    process.
+    '''
+    global vparser
+    database = PickledDataBase(DataBase(directory))
+    vparser = vhdl_parser.VHDLParser(database)
+
+
 def parsed_from_filename(filename):
     '''
     Parse the contents of a VHDL file using the VUnit VHDL parser.
@@ -27,10 +43,34 @@ def parsed_from_filename(filename):
     return parsed
 
 
-class Use:
+def parsed_from_filenames(filenames, n_workers=1):
+    '''
+    Parse the contents of a list of VHDL files.  Files that are not found in
+    the parse cache are parsed using a pool of `n_workers` processes.
+    The results are in the same order as `filenames`.
+    '''
+    codes = [vhdl_parser.read_code(fn) for fn in filenames]
+    parsed_files = [vparser.lookup(code) for code in codes]
+    missing = [index for index, parsed in enumerate(parsed_files) if parsed is None]
+    missing_codes = [codes[index] for index in missing]
+    if (n_workers > 1) and (len(missing) > 1):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+            new_parsed_files = list(executor.map(
+                vhdl_parser.VHDLDesignFile.parse, missing_codes))
+    else:
+        new_parsed_files = [vhdl_parser.VHDLDesignFile.parse(code) for code in missing_codes]
+    for index, code, parsed in zip(missing, missing_codes, new_parsed_files):
+        vparser.store(code, parsed)
+        parsed_files[index] = parsed
+    return parsed_files
+
+
+class Use(Slotted):
     '''
     Defines a package dependency for a package or entity.
     '''
+    __slots__ = ('library', 'design_unit', 'name_within', 'package')
+
     def __init__(self, library, design_unit, name_within, package=None):
         self.library = library
         self.design_unit = design_unit
@@ -110,24 +150,17 @@ def resolve_packages(packages):
             identifier='textio', constants={}, types={
                 }, uses={}),
         }
-    resolved_package_names = list(standard_packages)
-    toresolve_package_names = [p.identifier for p in packages]
-    while toresolve_package_names:
-        any_resolved = False
-        for pn in toresolve_package_names:
-            dependencies = pd[pn].uses.keys()
-            if not (set(dependencies) - set(resolved_package_names)):
-                resolved = pd[pn].resolve(resolved_pd)
-                any_resolved = True
-                resolved_package_names.append(pn)
-                resolved_pd[pn] = resolved
-            else:
-                logger.debug('Trying to resolve {} but has unresolved dependencies {}'.format(pn, set(dependencies) - set(resolved_package_names)))
-        toresolve_package_names = [x for x in toresolve_package_names
-                                   if x not in resolved_package_names]
-        if not any_resolved:
-            raise Exception('Failing to resolve packages {}'.format(
-                toresolve_package_names))
+    dependencies = dict([(p.identifier, p.uses.keys()) for p in packages])
+    missing = missing_dependencies(dependencies, available=resolved_pd)
+    if missing:
+        raise Exception('Failing to resolve packages. Missing dependencies {}'.format(
+            missing))
+    order, blocked = topological_order(dependencies)
+    if blocked:
+        raise Exception('Failing to resolve packages. Circular dependency {}'.format(
+            ' -> '.join(find_cycle(blocked, dependencies))))
+    for pn in order:
+        resolved_pd[pn] = pd[pn].resolve(resolved_pd)
     return resolved_pd
 
 
@@ -162,6 +195,75 @@ def combine_packages(packages):
     return combined_types, combined_constants
 
 
+def topological_order(dependencies):
+    '''
+    Order items so that each item comes after the items it depends upon,
+    using Kahn's algorithm.  Dependencies on names that are not keys of
+    `dependencies` are ignored.
+
+    Args:
+      `dependencies`: a dictionary mapping each item name to the names of
+           the items upon which it depends.
+
+    Returns:
+      `order`: a list of the names that could be ordered.
+      `blocked`: a list of the names that are in, or depend upon, a
+           circular dependency.
+    '''
+    in_degrees = {}
+    dependents = dict([(name, []) for name in dependencies])
+    for name, item_dependencies in dependencies.items():
+        internal = [d for d in collections.OrderedDict.fromkeys(item_dependencies)
+                    if d in dependencies]
+        in_degrees[name] = len(internal)
+        for dependency in internal:
+            dependents[dependency].append(name)
+    ready = collections.deque([name for name in dependencies if in_degrees[name] == 0])
+    order = []
+    while ready:
+        name = ready.popleft()
+        order.append(name)
+        for dependent in dependents[name]:
+            in_degrees[dependent] -= 1
+            if in_degrees[dependent] == 0:
+                ready.append(dependent)
+    blocked = [name for name in dependencies if in_degrees[name] > 0]
+    return order, blocked
+
+
+def find_cycle(blocked, dependencies):
+    '''
+    Find a circular dependency amongst the `blocked` names returned by
+    `topological_order`.
+    Returns a list of names where the last is the same as the first.
+    '''
+    blocked_set = set(blocked)
+    path = [blocked[0]]
+    positions = {blocked[0]: 0}
+    while True:
+        # Every blocked item depends on at least one other blocked item.
+        name = [d for d in dependencies[path[-1]] if d in blocked_set][0]
+        if name in positions:
+            return path[positions[name]:] + [name]
+        positions[name] = len(path)
+        path.append(name)
+
+
+def missing_dependencies(dependencies, available):
+    '''
+    Find the dependencies that are neither in `available` nor are
+    themselves items in `dependencies`.
+    Returns a dictionary mapping item names to their missing dependencies.
+    '''
+    missing = {}
+    for name, item_dependencies in dependencies.items():
+        item_missing = [d for d in item_dependencies
+                        if (d not in dependencies) and (d not in available)]
+        if item_missing:
+            missing[name] = item_missing
+    return missing
+
+
 def resolve_dependencies(available, unresolved, dependencies, resolve_function):
     '''
     Resolves dependencies.
@@ -175,55 +277,35 @@ def resolve_dependencies(available, unresolved, dependencies, resolve_function):
 
     Returns:
       `resolved`: a dictionary of resolved item.
+      `failed`: a dictionary of the items that could not be resolved because
+           of missing or circular dependencies.
     '''
+    assert(not (set(unresolved.keys()) & set(available.keys())))
     updated_available = available.copy()
-    unresolved_names = list(unresolved.keys())
-    available_names = list(available.keys())
-    assert(not (set(unresolved_names) & set(available_names)))
+    item_dependencies = dict([(name, dependencies[name]) for name in unresolved])
+    missing = missing_dependencies(item_dependencies, available=available)
+    order, blocked = topological_order(item_dependencies)
     resolved = {}
     failed = {}
-    failed_names = []
-    while unresolved_names:
-        any_changes = False
-        for unresolved_name in unresolved_names:
-            unresolved_item = unresolved[unresolved_name]
-            item_dependencies = dependencies[unresolved_name]
-            if set(item_dependencies) & set(failed_names):
-                any_changes = True
-                # Cannot resolve this since a dependency has failed.
-                failed[unresolved_name] = unresolved_item
-                failed_names.append(unresolved_name)
-            elif not (set(item_dependencies) - set(available_names)):
-                any_changes = True
-                failed_to_resolve = False
-                resolved_item = resolve_function(
-                    unresolved_name, unresolved_item, updated_available)
-                try:
-                    resolved_item = resolve_function(
-                        unresolved_name, unresolved_item, updated_available)
-                except Exception as e:
-                    logger.error('Failed to resolve {}.  Error caught when resolving.'.format(unresolved_name))
-                    failed[unresolved_name] = unresolved_item
-                    failed_names.append(unresolved_name)
-                    failed_to_resolve = True
-                if not failed_to_resolve:
-                    assert(unresolved_name not in resolved)
-                    resolved[unresolved_name] = resolved_item
-                    assert(unresolved_name not in updated_available)
-                    updated_available[unresolved_name] = resolved_item
-                    assert(unresolved_name not in available_names)
-                    available_names.append(unresolved_name)
-        if not any_changes:
-            logger.debug('Failed to resolve {}'.format(unresolved_names))
-            for unresolved_name in unresolved_names:
-                unresolved_item = unresolved[unresolved_name]
-                logger.debug('{} was missing the dependencies: {}'.format(
-                    unresolved_name,
-                    set(dependencies[unresolved_name]) - set(available_names)))
-                failed[unresolved_name] = unresolved_item
-                failed_names.append(unresolved_name)
-        unresolved_names = list(set(unresolved_names) - set(available_names) -
-                                set(failed_names))
+    for unresolved_name in order:
+        unresolved_item = unresolved[unresolved_name]
+        if unresolved_name in missing:
+            logger.debug('{} was missing the dependencies: {}'.format(
+                unresolved_name, missing[unresolved_name]))
+            failed[unresolved_name] = unresolved_item
+        elif [d for d in item_dependencies[unresolved_name] if d in failed]:
+            # Cannot resolve this since a dependency has failed.
+            failed[unresolved_name] = unresolved_item
+        else:
+            resolved_item = resolve_function(
+                unresolved_name, unresolved_item, updated_available)
+            resolved[unresolved_name] = resolved_item
+            updated_available[unresolved_name] = resolved_item
+    if blocked:
+        logger.warning('Failed to resolve {}. Circular dependency {}'.format(
+            blocked, ' -> '.join(find_cycle(blocked, item_dependencies))))
+        for unresolved_name in blocked:
+            failed[unresolved_name] = unresolved[unresolved_name]
     return resolved, failed
 
 
@@ -14,6 +14,32 @@ from slvcodec import typs, symbolic_math
 
 logger = logging.getLogger(__name__)
 
+# Templates are compiled once per process and kept by the environment.  The
+# environment is created when it is first needed.
+_template_environment = None
+
+
+def get_template_environment():
+    '''
+    Get the jinja2 environment that the templates are loaded from.
+    '''
+    global _template_environment
+    if _template_environment is None:
+        _template_environment = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(os.path.join(os.path.dirname(__file__), 'templates')),
+            auto_reload=False,
+        )
+    return _template_environment
+
+
+def use_template_cache(directory):
+    '''
+    Also cache the compiled templates on disk in `directory` so that new
+    processes can skip compiling them.
+    '''
+    os.makedirs(directory, exist_ok=True)
+    get_template_environment().bytecode_cache = jinja2.FileSystemBytecodeCache(directory)
+
 
 declarations_template = '''  constant {type.identifier}_slvcodecwidth: natural := {width_expression};
   function to_slvcodec (constant data: {type.identifier}) return std_logic_vector;
@@ -34,10 +60,8 @@ def make_record_declarations_and_definitions(record_type):
         type=record_type,
         width_expression=symbolic_math.str_expression(record_type.width),
         )
-    template_fn = os.path.join(os.path.dirname(__file__), 'templates',
-                               'slvcodec_record_template.vhd')
-    with open(template_fn, 'r') as f:
-        definitions_template = jinja2.Template(f.read())
+    definitions_template = get_template_environment().get_template(
+        'slvcodec_record_template.vhd')
     indices_names_and_widths = []
     for index, name_and_subtype in enumerate(record_type.names_and_subtypes):
         name, subtype = name_and_subtype
@@ -58,10 +82,8 @@ def make_enumeration_declarations_and_definitions(enumeration_type):
         type=enumeration_type,
         width_expression=symbolic_math.str_expression(enumeration_type.width),
         )
-    template_fn = os.path.join(os.path.dirname(__file__), 'templates',
-                               'slvcodec_enumeration_template.vhd')
-    with open(template_fn, 'r') as f:
-        definitions_template = jinja2.Template(f.read())
+    definitions_template = get_template_environment().get_template(
+        'slvcodec_enumeration_template.vhd')
     definitions = definitions_template.render(
         type=enumeration_type.identifier,
         literals=enumeration_type.literals,
@@ -105,9 +127,8 @@ def make_array_declarations_and_definitions(array_type):
     else:
         functions_declarations = functions_declarations_template.format(type=array_type)
         declarations = '\n'.join([width_declaration, functions_declarations])
-        template_fn = os.path.join(os.path.dirname(__file__), 'templates', 'slvcodec_array_template.vhd')
-        with open(template_fn, 'r') as f:
-            definitions_template = jinja2.Template(f.read())
+        definitions_template = get_template_environment().get_template(
+            'slvcodec_array_template.vhd')
         definitions = definitions_template.render(
             type=array_type.identifier,
             subtype_width=subtype_width,
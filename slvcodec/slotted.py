@@ -0,0 +1,68 @@
+'''
+A base class for the many small objects that describe types, ports and
+parse results.
+
+The classes define `__slots__` so that instances have no per-instance
+`__dict__`.  They are pickled as a tuple of slot values, in a fixed order,
+rather than a dictionary of slot names to values, which keeps the pickles
+that are sent to worker processes and to the parse cache small.
+'''
+
+import functools
+import operator
+
+
+class Unset:
+    '''
+    Marks a slot that has not been assigned in a pickled state.
+    '''
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def all_slots(cls):
+    '''
+    The names of all the slots of a class, including inherited slots.
+    '''
+    names = []
+    for base in reversed(cls.__mro__):
+        slots = base.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        names += [name for name in slots if name not in names]
+    return tuple(names)
+
+
+@functools.lru_cache(maxsize=None)
+def slot_accessors(cls):
+    '''
+    A function that gets the values of all the slots of a class as a
+    tuple, and the descriptors used to set them.
+    '''
+    names = all_slots(cls)
+    getter = operator.attrgetter(*names) if len(names) > 1 else (
+        lambda obj: tuple(getattr(obj, name) for name in names))
+    descriptors = tuple(getattr(cls, name) for name in names)
+    return getter, descriptors
+
+
+class Slotted:
+    '''
+    Base class for classes that define `__slots__`.
+    '''
+
+    __slots__ = ()
+
+    def __getstate__(self):
+        getter, descriptors = slot_accessors(type(self))
+        try:
+            state = getter(self)
+        except AttributeError:
+            state = tuple(getattr(self, name, Unset) for name in all_slots(type(self)))
+        return state
+
+    def __setstate__(self, state):
+        getter, descriptors = slot_accessors(type(self))
+        for descriptor, value in zip(descriptors, state):
+            if value is not Unset:
+                descriptor.__set__(self, value)
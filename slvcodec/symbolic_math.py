@@ -3,6 +3,7 @@ Functions to deal with doing math on algebraic strings.
 Useful for parsing VHDL.
 '''
 
+import functools
 import tokenize
 import logging
 import math
@@ -12,6 +13,22 @@ from io import StringIO
 
 logger = logging.getLogger(__name__)
 
+# The number of results remembered by each of the memoized functions
+# `simplify`, `get_constant_list` and `str_expression`.
+EXPRESSION_CACHE_SIZE = 4096
+
+# The expression nodes that have been created, keyed by their type and
+# items, so that identical nodes are shared.  The table holds strong
+# references, so it is emptied when it grows beyond `INTERNED_NODES_SIZE`
+# and by `clear_caches`.  Nodes stay valid after it is emptied because
+# nodes that are not the same object are compared by their items.
+INTERNED_NODES_SIZE = 1 << 16
+interned_nodes = {}
+
+
+class ResolutionError(Exception):
+    pass
+
 
 def logceil(argument):
     '''
@@ -82,6 +99,7 @@ def collect(item, f):
     return collected
 
 
+@functools.lru_cache(maxsize=EXPRESSION_CACHE_SIZE, typed=True)
 def str_expression(item):
     '''
     Returns a string representation of the mathematical equation.
@@ -109,6 +127,11 @@ def get_constant_list(item):
     >>> get_constant_list(item)
     {'bear', 'fish'}
     '''
+    return set(_get_constants(item))
+
+
+@functools.lru_cache(maxsize=EXPRESSION_CACHE_SIZE, typed=True)
+def _get_constants(item):
     if isinstance(item, str):
         if '"' in item:
             # Probably something like "001"
@@ -119,8 +142,8 @@ def get_constant_list(item):
         else:
             collected = [item]
     else:
-        collected = collect(item, get_constant_list)
-    return set(collected)
+        collected = collect(item, _get_constants)
+    return frozenset(collected)
 
 
 def parse_integers(item):
@@ -169,6 +192,7 @@ def parse_addition(item):
     return parsed
 
 
+@functools.lru_cache(maxsize=EXPRESSION_CACHE_SIZE, typed=True)
 def simplify(item):
     old_value = item
     max_simplifications = 5
@@ -202,8 +226,98 @@ def get_value(item):
     return result
 
 
+@functools.lru_cache(maxsize=EXPRESSION_CACHE_SIZE, typed=True)
+def compile_expression(item):
+    '''
+    Compile an expression into a function that takes a dictionary of
+    generic values and returns the value of the expression.  Names and
+    `Generic` objects are looked up in the dictionary.  The function gives
+    the same result as substituting the values and calling `get_value`,
+    but the expression tree is only walked once.
+    '''
+    if is_number(item):
+        value = as_number(item)
+
+        def evaluate(generics):
+            return value
+    elif isinstance(item, str):
+        # A name that has not been replaced by an object.
+        def evaluate(generics):
+            if item not in generics:
+                raise ResolutionError('Missing generic {}'.format(item))
+            return as_number(generics[item])
+    elif hasattr(item, 'compile'):
+        compiled = item.compile()
+
+        def evaluate(generics):
+            return as_number(compiled(generics))
+    else:
+        raise Exception('Cannot compile {}'.format(item))
+    return evaluate
+
+
+def node_key(node):
+    '''
+    The key of a node in `interned_nodes`.  Nodes with equal keys are equal.
+    '''
+    return (type(node),) + tuple((type(item), item) for item in node)
+
+
+def intern_node(node):
+    '''
+    Returns the existing node that is identical to `node`, or `node` itself
+    if it is new.
+    '''
+    key = node_key(node)
+    interned = interned_nodes.get(key, None)
+    if interned is None:
+        if len(interned_nodes) >= INTERNED_NODES_SIZE:
+            interned_nodes.clear()
+        node._hash = hash(key)
+        interned_nodes[key] = node
+        interned = node
+    return interned
+
+
+def clear_caches():
+    '''
+    Empty the table of interned nodes and the memoized results, releasing
+    the expressions (and the constants and generics in them) that they
+    refer to.
+    '''
+    interned_nodes.clear()
+    for f in (str_expression, _get_constants, simplify, compile_expression):
+        f.cache_clear()
+
+
+class Node:
+    '''
+    Base class for the namedtuple expression nodes.
+
+    Nodes are interned, so identical nodes are usually the same object
+    and can be compared by identity.  Nodes created before the intern table
+    was emptied are compared by their items instead.  A node is never
+    equal to a node of a different type with the same items.
+    '''
+
+    def __eq__(self, other):
+        return (self is other) or (
+            isinstance(other, Node) and (self._hash == other._hash) and
+            (node_key(self) == node_key(other)))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self._hash
+
+    def __getstate__(self):
+        # The cached hash is not valid in another process.
+        return None
+
+
 ExpressionBase = namedtuple('ExpressionBase', ['items'])
-class Expression(ExpressionBase):
+class Expression(Node, ExpressionBase):
     '''
     An expression is just a list of tokens and parsed elements.
     It's an intemediate form used during parsing.
@@ -211,7 +325,7 @@ class Expression(ExpressionBase):
 
     def __new__(cls, items):
         obj = ExpressionBase.__new__(cls, tuple(items))
-        return obj
+        return intern_node(obj)
 
     def transform(self, f):
         new_items = [f(item) for item in self.items]
@@ -230,6 +344,9 @@ class Expression(ExpressionBase):
     def value(self):
         raise Exception('Cannot get value of a unparsed expression.')
 
+    def compile(self):
+        raise Exception('Cannot compile an unparsed expression.')
+
     def str_expression(self):
         return ' '.join([str_expression(item) for item in self.items])
 
@@ -372,14 +489,21 @@ class Unknown(object):
     def value(self):
         raise Exception('Cannot get value of Unknown.')
 
+    def compile(self):
+        raise Exception('Cannot compile Unknown.')
+
 
 FunctionBase = namedtuple('FunctionBase', ['name', 'argument'])
-class Function(FunctionBase):
+class Function(Node, FunctionBase):
     '''
     Represents a function in the expression.  Currently it 
     only supports the log ceiling.
     '''
 
+    def __new__(cls, name, argument):
+        obj = FunctionBase.__new__(cls, name, argument)
+        return intern_node(obj)
+
     def transform(self, f):
         new_argument = f(self.argument)
         f = Function(name=self.name, argument=new_argument)
@@ -391,17 +515,25 @@ class Function(FunctionBase):
 
     def value(self):
         argument = get_value(self.argument)
+        return self.function()(argument)
+
+    def function(self):
         if self.name in ['logceil', 'clog2', 'slvcodec_logceil']:
-            v = logceil(argument)
+            f = logceil
         elif self.name in ('real', 'integer',):
-            v = argument
+            f = lambda argument: argument
         elif self.name in ('ceil',):
-            v = math.ceil(argument)
+            f = math.ceil
         elif self.name in ('pow2',):
-            v = pow(2, argument)
+            f = lambda argument: pow(2, argument)
         else:
             raise Exception('Unknown function {}'.format(self.name))
-        return v
+        return f
+
+    def compile(self):
+        argument = compile_expression(self.argument)
+        f = self.function()
+        return lambda generics: f(argument(generics))
 
     def simplify(self):
         argument = simplify(self.argument)
@@ -417,7 +549,7 @@ class Function(FunctionBase):
 
 
 PowerBase = namedtuple('TermBase', ['number', 'expression'])
-class Power(PowerBase):
+class Power(Node, PowerBase):
     '''
     A multiplication object contains many Power objects.  This is to make
     it easy to combine x * y * x into (x ** 2) * y where (x**2) is a power
@@ -431,7 +563,7 @@ class Power(PowerBase):
         assert(is_number(number))
         obj = PowerBase.__new__(
             cls, number, expression)
-        return obj
+        return intern_node(obj)
 
     def transform(self, f):
         expression = f(self.expression)
@@ -446,6 +578,11 @@ class Power(PowerBase):
         result = pow(get_value(self.expression), self.number)
         return result
 
+    def compile(self):
+        expression = compile_expression(self.expression)
+        number = self.number
+        return lambda generics: pow(expression(generics), number)
+
     def str_expression(self):
         if self.number == 1:
             s = str_expression(self.expression)
@@ -461,7 +598,7 @@ class Power(PowerBase):
 
 
 MultiplicationBase = namedtuple('MultiplicationBase', ['powers'])
-class Multiplication(MultiplicationBase):
+class Multiplication(Node, MultiplicationBase):
     '''
     A group of items which are multiplied/divided together.
     '''
@@ -469,7 +606,7 @@ class Multiplication(MultiplicationBase):
     def __new__(cls, powers):
         obj = MultiplicationBase.__new__(
             cls, tuple(powers))
-        return obj
+        return intern_node(obj)
 
     def transform(self, f):
         powers = [f(item) for item in self.powers]
@@ -489,6 +626,16 @@ class Multiplication(MultiplicationBase):
             result *= n
         return result
 
+    def compile(self):
+        powers = [compile_expression(item) for item in self.powers]
+
+        def evaluate(generics):
+            result = 1.0
+            for power in powers:
+                result *= power(generics)
+            return result
+        return evaluate
+
     def str_expression(self):
         s = '*'.join([str_expression(item) for item in self.powers])
         return s
@@ -547,7 +694,7 @@ class Multiplication(MultiplicationBase):
 
 
 TermBase = namedtuple('TermBase', ['number', 'expression'])
-class Term(TermBase):
+class Term(Node, TermBase):
     '''
     An Addition object contains many Term objects.
     Useful so that we can easily combine multiples instances of the
@@ -558,7 +705,7 @@ class Term(TermBase):
         assert(is_number(number))
         obj = TermBase.__new__(
             cls, number, expression)
-        return obj
+        return intern_node(obj)
 
     def transform(self, f):
         expression = f(self.expression)
@@ -573,6 +720,11 @@ class Term(TermBase):
         result = self.number * get_value(self.expression)
         return result
 
+    def compile(self):
+        expression = compile_expression(self.expression)
+        number = self.number
+        return lambda generics: number * expression(generics)
+
     def str_expression(self):
         if self.number == 1:
             s = str_expression(self.expression)
@@ -585,14 +737,14 @@ class Term(TermBase):
 
 
 AdditionBase = namedtuple('AdditionBase', ['terms'])
-class Addition(AdditionBase):
+class Addition(Node, AdditionBase):
     '''
     Many items that are added/substracted together.
     '''
 
     def __new__(cls, terms):
         obj = AdditionBase.__new__(cls, tuple(terms))
-        return obj
+        return intern_node(obj)
 
     def transform(self, f):
         terms = [f(term) for term in self.terms]
@@ -610,6 +762,10 @@ class Addition(AdditionBase):
         result = sum(values)
         return result
 
+    def compile(self):
+        terms = [compile_expression(item) for item in self.terms]
+        return lambda generics: sum([term(generics) for term in terms])
+
     def str_expression(self):
         s = ''
         first = True
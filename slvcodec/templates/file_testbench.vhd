@@ -26,14 +26,14 @@ begin
   input_data <= from_slvcodec(input_slv);
   output_slv <= to_slvcodec(output_data);
 
-  file_reader: entity work.ReadFile
+  file_reader: entity work.{{reader_name}}
     generic map(FILENAME => OUTPUT_PATH & "/indata.dat",
                 PASSED_RUNNER_CFG => RUNNER_CFG,
                 WIDTH => t_input_slvcodecwidth)
     port map(clk => read_clk,
              out_data => input_slv);
 
-  file_writer: entity work.WriteFile
+  file_writer: entity work.{{writer_name}}
     generic map(FILENAME => OUTPUT_PATH & "/outdata.dat",
                 WIDTH => t_output_slvcodecwidth)
     port map(clk => write_clk,
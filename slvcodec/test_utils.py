@@ -3,16 +3,18 @@ Functions that make it easier to generate test benchs and run
 tests in vunit.
 '''
 
+import copy
 import os
-import shutil
 import itertools
 import logging
+import pickle
 import random
 
 import fusesoc_generators
 from slvcodec import add_slvcodec_files
 from slvcodec import filetestbench_generator
-from slvcodec import params_helper, config
+from slvcodec import params_helper, config, conversions, package, package_generator, typs
+from slvcodec.entity import chunked
 
 
 logger = logging.getLogger(__name__)
@@ -20,10 +22,20 @@ logger = logging.getLogger(__name__)
 dir_path = os.path.dirname(os.path.realpath(__file__))
 helper_files = os.path.join(dir_path, 'vhdl', '*.vhd')
 
+# The number of lines that are written to a data file at once.
+CHUNK_SIZE = 10000
+
+# The file in which the original input data is saved when the input
+# sidecar is used, and the pickle protocol it is saved with.  Protocol 5
+# (Python 3.8 onwards) saves NumPy arrays without copying them.
+SIDECAR_FILENAME = 'indata.pickle'
+SIDECAR_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
 
 def register_rawtest_with_vunit(
         vu, resolved, filenames, top_entity, all_generics, test_class,
-        top_params):
+        top_params, hex_format=False, n_decode_workers=1, input_sidecar=False,
+        lazy_outputs=False):
     '''
     Register a test with vunit.
     Args:
@@ -36,6 +48,15 @@ def register_rawtest_with_vunit(
       `test_class`: A function that takes (resolved, generics, top_params) and
          returns an object with make_input_data and check_output_data methods.
       `top_params`: Top level parameters to pass to the test class.
+      `hex_format`: Whether the testbench uses the hex line format for the
+         data files.
+      `n_decode_workers`: The number of processes used to decode the data
+         files after the simulation.
+      `input_sidecar`: Whether to save the original input data so that
+         indata.dat does not need to be decoded after the simulation.
+      `lazy_outputs`: Whether the outputs passed to the checks are
+         `entity.LazyPorts` mappings that only decode the ports that are
+         accessed.
     '''
     random_lib_name = 'lib' + str(random.randint(0, 1000000))
     try:
@@ -59,14 +80,19 @@ def register_rawtest_with_vunit(
         tb_generated.add_config(
             name=name_with_suffix,
             generics=generics,
-            pre_config=make_pre_config(test, entity, generics),
-            post_check=make_post_check(test, entity, generics),
+            pre_config=make_pre_config(test, entity, generics, hex_format=hex_format,
+                                       input_sidecar=input_sidecar),
+            post_check=make_post_check(test, entity, generics, hex_format=hex_format,
+                                       n_workers=n_decode_workers,
+                                       input_sidecar=input_sidecar,
+                                       lazy_outputs=lazy_outputs),
         )
 
 
 def register_test_with_vunit(
         vu, directory, filenames, top_entity, all_generics, test_class,
-        top_params):
+        top_params, hex_format=False, n_decode_workers=1, input_sidecar=False,
+        lazy_outputs=False):
     '''
     Register a test with vunit.
     Args:
@@ -79,16 +105,26 @@ def register_test_with_vunit(
       `test_class`: A function that takes (resolved, generics, top_params) and
          returns an object with make_input_data and check_output_data methods.
       `top_params`: Top level parameters to pass to the test class.
+      `hex_format`: Whether the testbench uses the hex line format for the
+         data files.
+      `n_decode_workers`: The number of processes used to decode the data
+         files after the simulation.
+      `input_sidecar`: Whether to save the original input data so that
+         indata.dat does not need to be decoded after the simulation.
+      `lazy_outputs`: Whether the outputs passed to the checks are
+         `entity.LazyPorts` mappings that only decode the ports that are
+         accessed.
     '''
+    package.use_parse_cache(os.path.join(directory, 'parse_cache'))
+    package_generator.use_template_cache(os.path.join(directory, 'template_cache'))
     ftb_directory = os.path.join(directory, 'ftb')
-    if os.path.exists(ftb_directory):
-        shutil.rmtree(ftb_directory)
-    os.makedirs(ftb_directory)
-    logger.debug('update_vunit deleting {}'.format(ftb_directory))
+    # Generated files are only rewritten when they change so that vunit
+    # does not need to recompile them.
+    os.makedirs(ftb_directory, exist_ok=True)
     with_slvcodec_files = add_slvcodec_files(directory, filenames)
     generated_fns, resolved = filetestbench_generator.prepare_files(
         directory=ftb_directory, filenames=with_slvcodec_files,
-        top_entity=top_entity)
+        top_entity=top_entity, hex_format=hex_format)
     combined_filenames = with_slvcodec_files + generated_fns
     register_rawtest_with_vunit(
         vu=vu,
@@ -98,6 +134,10 @@ def register_test_with_vunit(
         all_generics=all_generics,
         test_class=test_class,
         top_params=top_params,
+        hex_format=hex_format,
+        n_decode_workers=n_decode_workers,
+        input_sidecar=input_sidecar,
+        lazy_outputs=lazy_outputs,
     )
 
 
@@ -113,6 +153,14 @@ def register_coretest_with_vunit(vu, test, test_output_directory):
         `top_entity`: The name of the entity to test.
         `generator`: A function that takes (resolved, generics, top_params) and
          returns an object with make_input_data and check_output_data methods.
+        `hex_format`: Optional.  Whether the testbench uses the hex line
+         format for the data files.
+        `n_decode_workers`: Optional.  The number of processes used to
+         decode the data files after the simulation.
+        `input_sidecar`: Optional.  Whether to save the original input data
+         so that indata.dat does not need to be decoded after the simulation.
+        `lazy_outputs`: Optional.  Whether the outputs passed to the checks
+         only decode the ports that are accessed.
     '''
     if 'param_sets' in test:
         param_sets = test['param_sets']
@@ -126,16 +174,21 @@ def register_coretest_with_vunit(vu, test, test_output_directory):
             'generic_sets': [{}],
             'top_params': {},
         }]
+    hex_format = test.get('hex_format', False)
+    n_decode_workers = test.get('n_decode_workers', 1)
+    input_sidecar = test.get('input_sidecar', False)
+    lazy_outputs = test.get('lazy_outputs', False)
+    package.use_parse_cache(os.path.join(test_output_directory, 'parse_cache'))
+    package_generator.use_template_cache(os.path.join(test_output_directory, 'template_cache'))
     for param_set in param_sets:
         generic_sets = param_set['generic_sets']
         top_params = param_set['top_params']
-        h = hash(params_helper.make_hashable(top_params))
+        # The directory name must be the same in every run so that files
+        # generated by previous runs can be reused.
+        h = params_helper.make_constant_hash(top_params)
         generation_directory = os.path.join(
             test_output_directory, test['core_name'], 'generated_{}'.format(h))
-        if os.path.exists(generation_directory):
-            shutil.rmtree(generation_directory)
-        logger.debug('Removing directory {}'.format(generation_directory))
-        os.makedirs(generation_directory)
+        os.makedirs(generation_directory, exist_ok=True)
         # Create this side effect object so that we can create a function
         # that has the interface fusesoc_generator expects but we can still
         # get access to the 'resolved' from parsing.
@@ -143,12 +196,10 @@ def register_coretest_with_vunit(vu, test, test_output_directory):
             generation_directory, test['core_name'], test['entity_name'],
             generic_sets, top_params, add_slvcodec_files)
         ftb_directory = os.path.join(generation_directory, 'ftb')
-        if os.path.exists(ftb_directory):
-            shutil.rmtree(ftb_directory)
-        os.makedirs(ftb_directory)
+        os.makedirs(ftb_directory, exist_ok=True)
         generated_fns, resolved = filetestbench_generator.prepare_files(
             directory=ftb_directory, filenames=filenames,
-            top_entity=test['entity_name'])
+            top_entity=test['entity_name'], hex_format=hex_format)
         combined_filenames = filenames + generated_fns
         register_rawtest_with_vunit(
             vu=vu,
@@ -158,6 +209,10 @@ def register_coretest_with_vunit(vu, test, test_output_directory):
             all_generics=generic_sets,
             test_class=test['generator'],
             top_params=top_params,
+            hex_format=hex_format,
+            n_decode_workers=n_decode_workers,
+            input_sidecar=input_sidecar,
+            lazy_outputs=lazy_outputs,
         )
 
 
@@ -173,43 +228,241 @@ def run_vunit(tests, cores_roots, test_output_directory):
     vu.main()
 
 
-def make_pre_config(test, entity, generics):
+def write_lines(filename, lines, chunk_size=CHUNK_SIZE):
+    '''
+    Write an iterable of lines to a file a chunk at a time so that all the
+    lines never need to be held in memory.
+    '''
+    with open(filename, 'w') as f:
+        separator = ''
+        for chunk in chunked(lines, chunk_size):
+            f.write(separator + '\n'.join(chunk))
+            separator = '\n'
+
+
+def read_lines(filename):
+    '''
+    Iterate over the lines in a file without reading it all into memory.
+    '''
+    with open(filename, 'r') as f:
+        for line in f:
+            yield line
+
+
+def is_columnar(data):
+    '''
+    Whether input data is columnar (a NumPy structured array or a
+    dictionary of arrays) rather than an iterable of dictionaries.
+    '''
+    return isinstance(data, dict) or hasattr(data, 'dtype')
+
+
+def pair_outputs(i_data, o_data):
+    '''
+    Iterate over (input, output) pairs.  The outputs are trimmed to the
+    length of the inputs but an exception is raised if there are fewer
+    outputs than inputs, for example because the simulation stopped early.
+    '''
+    o_iter = iter(o_data)
+    for index, i_d in enumerate(i_data):
+        o_d = next(o_iter, None)
+        if o_d is None:
+            raise Exception(
+                'The output data ended after {} lines but there are more input lines.'.format(
+                    index))
+        yield i_d, o_d
+
+
+def pickle_chunks(f, items, chunk_size=CHUNK_SIZE):
+    '''
+    Pass through an iterable, pickling the items to the file `f` a chunk
+    at a time as they go past.
+    '''
+    for chunk in chunked(items, chunk_size):
+        pickle.dump(chunk, f, protocol=SIDECAR_PROTOCOL)
+        for item in chunk:
+            yield item
+
+
+def unpickle_chunks(f):
+    '''
+    Iterate over the items pickled by `pickle_chunks`.  `f` is closed
+    once all the items have been read.
+    '''
+    with f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                break
+            for item in chunk:
+                yield item
+
+
+def read_sidecar(filename):
+    '''
+    Read the original input data saved by the pre_config function.
+    Returns an iterator over the data, or None if the data was columnar
+    and so was not saved.
+    '''
+    f = open(filename, 'rb')
+    columnar = pickle.load(f)
+    if columnar:
+        f.close()
+        data = None
+    else:
+        data = unpickle_chunks(f)
+    return data
+
+
+def fill_missing_ports(i_data, undefined):
+    '''
+    Iterate over input dictionaries with the ports that are missing or None
+    set to their values in `undefined`, the decoded inputs of a line of
+    'U's, as they are when indata.dat is decoded.
+    '''
+    for i_d in i_data:
+        filled = {}
+        for name, undefined_value in undefined.items():
+            value = i_d.get(name, None)
+            if value is None:
+                value = copy.deepcopy(undefined_value)
+            filled[name] = value
+        yield filled
+
+
+def make_pre_config(test, entity, generics, hex_format=False, input_sidecar=False):
     '''
     Create a function to run before running the simulator.
+    If `hex_format` is True indata.dat is written in the hex line format.
+    If `input_sidecar` is True the original input data is also saved with
+    pickle so that the post_check function does not need to decode
+    indata.dat.  Columnar input data is not saved.
     '''
+    # Frozen once so that converting each line does not sort the generics.
+    generics = typs.FrozenGenerics(generics)
+
+    def write_inputs(i_data, datainfilename):
+        if is_columnar(i_data):
+            # The input data is columnar (a structured array or a dictionary
+            # of arrays) so it can be encoded in a single vectorized pass.
+            if hex_format:
+                lines = entity.columns_to_lines(i_data, generics=generics)
+                write_lines(datainfilename, (conversions.slv_to_hex(line) for line in lines))
+            else:
+                entity.columns_to_file(i_data, datainfilename, generics=generics)
+        else:
+            # `i_data` may be a generator in which case the lines are
+            # generated and written a chunk at a time.
+            if hex_format:
+                inputs_to_line = entity.inputs_to_hex
+            else:
+                inputs_to_line = entity.inputs_to_slv
+            lines = (inputs_to_line(line, generics=generics) for line in i_data)
+            write_lines(datainfilename, lines)
+
     def pre_config(output_path):
         '''
         Generate the input data and write it to a file.
         '''
         i_data = test.make_input_data()
-        lines = [entity.inputs_to_slv(line, generics=generics) for line in i_data]
         datainfilename = os.path.join(output_path, 'indata.dat')
-        with open(datainfilename, 'w') as f:
-            f.write('\n'.join(lines))
+        if input_sidecar:
+            with open(os.path.join(output_path, SIDECAR_FILENAME), 'wb') as f:
+                pickle.dump(is_columnar(i_data), f, protocol=SIDECAR_PROTOCOL)
+                if not is_columnar(i_data):
+                    i_data = pickle_chunks(f, i_data)
+                write_inputs(i_data, datainfilename)
+        else:
+            write_inputs(i_data, datainfilename)
         return True
     return pre_config
 
 
-def make_post_check(test, entity, generics):
+def make_post_check(test, entity, generics, hex_format=False, n_workers=1,
+                    input_sidecar=False, lazy_outputs=False):
     '''
     Create a function to run after running the simulator.
+    If `hex_format` is True the data files are read in the hex line format.
+    If `n_workers` is greater than 1 the data files are split into byte
+    ranges that are decoded by a pool of processes.
+    If `input_sidecar` is True the input data saved by the pre_config
+    function is used rather than decoding indata.dat.  Input ports that
+    are missing from the saved data are set to the values that a port of
+    'U's decodes to, but the values of the ports are passed to the checks as
+    `make_input_data` returned them.  Columnar input data is not saved so
+    it is always decoded from indata.dat.
+    If `lazy_outputs` is True each output is an `entity.LazyPorts`
+    mapping that only decodes the ports that the checks access.
+
+    If the test has a `check_output_stream` method then it is called with
+    an iterator of (input, output) pairs instead of calling
+    `check_output_data`.  The data files are then read and decoded
+    incrementally so memory use does not grow with the length of the test.
+
+    If the test has a `check_output_datafiles` method then it is called
+    with memory-mapped `datafile.DataFile` sequences of the inputs and
+    outputs.  Lines are only decoded when they are accessed.
     '''
+    generics = typs.FrozenGenerics(generics)
+
     def post_check(output_path):
         '''
         Read the input data and output data and run the check_output_data
         function to verify that the test passes.
         '''
-        # Read input data
         datainfilename = os.path.join(output_path, 'indata.dat')
-        with open(datainfilename, 'r') as f:
-            lines = f.readlines()
-        i_data = [entity.inputs_from_slv(line, generics=generics) for line in lines]
-        # Read output dta.
         dataoutfilename = os.path.join(output_path, 'outdata.dat')
-        with open(dataoutfilename, 'r') as f:
-            lines = f.readlines()
-        o_data = [entity.outputs_from_slv(line, generics=generics) for line in lines]
-        trimmed_o_data = o_data[:len(i_data)]
+        if input_sidecar:
+            sidecar_data = read_sidecar(os.path.join(output_path, SIDECAR_FILENAME))
+        else:
+            sidecar_data = None
+        if sidecar_data is not None:
+            codec = entity.codec(generics)
+            undefined = codec.ports_from_slv('U' * codec.widths['in'], 'in')
+            sidecar_data = fill_missing_ports(sidecar_data, undefined)
+        if hex_format:
+            inputs_from_line = entity.inputs_from_hex
+            outputs_from_line = entity.outputs_from_hex
+        else:
+            inputs_from_line = entity.inputs_from_slv
+            outputs_from_line = entity.outputs_from_slv
+        if hasattr(test, 'check_output_stream'):
+            if sidecar_data is not None:
+                i_data = sidecar_data
+            else:
+                i_data = (inputs_from_line(line, generics=generics)
+                          for line in read_lines(datainfilename))
+            o_data = (outputs_from_line(line, generics=generics, lazy=lazy_outputs)
+                      for line in read_lines(dataoutfilename))
+            test.check_output_stream(pair_outputs(i_data, o_data))
+            return True
+        if sidecar_data is None:
+            i_data = None
+        else:
+            i_data = list(sidecar_data)
+            n_inputs = len(i_data)
+        if hasattr(test, 'check_output_datafiles'):
+            with entity.open_outputs(
+                    dataoutfilename, generics=generics, hex_format=hex_format,
+                    lazy=lazy_outputs) as o_data:
+                if i_data is not None:
+                    test.check_output_datafiles(i_data, o_data[:n_inputs])
+                else:
+                    with entity.open_inputs(
+                            datainfilename, generics=generics,
+                            hex_format=hex_format) as i_data:
+                        test.check_output_datafiles(i_data, o_data[:len(i_data)])
+            return True
+        if i_data is None:
+            i_data = entity.inputs_from_lines(
+                datainfilename, generics=generics, hex_format=hex_format,
+                n_workers=n_workers)
+            n_inputs = len(i_data)
+        o_data = entity.outputs_from_lines(
+            dataoutfilename, generics=generics, hex_format=hex_format,
+            n_workers=n_workers, lazy=lazy_outputs)
+        trimmed_o_data = o_data[:n_inputs]
         # Check validity.
         test.check_output_data(i_data, trimmed_o_data)
         return True
@@ -1,21 +1,26 @@
+import collections
 import logging
 
 from slvcodec import symbolic_math, conversions
+from slvcodec.slotted import Slotted
 
 
 logger = logging.getLogger(__name__)
 
+# The number of resolved values each type keeps in its `ResolvedCache`.
+RESOLVED_CACHE_SIZE = 32
 
-class ResolutionError(Exception):
-    pass
+ResolutionError = symbolic_math.ResolutionError
 
 
-class Generic:
+class Generic(Slotted):
     '''
     A generic parameter.  When the generic cannot be resolved this object
     is used in the expression until resolution is possible.
     '''
 
+    __slots__ = ('name', 'typ', 'default')
+
     def __init__(self, name, typ, default=None):
         self.name = name
         self.typ = typ
@@ -24,6 +29,38 @@ class Generic:
     def str_expression(self):
         return self.name
 
+    def compile(self):
+        name = self.name
+
+        def evaluate(generics):
+            if name not in generics:
+                raise ResolutionError('Missing generic {}'.format(name))
+            return generics[name]
+        return evaluate
+
+
+class FrozenGenerics(dict):
+    '''
+    A dictionary of generics that remembers its `freeze_generics`
+    signature so that it is only calculated once.  It must not be modified
+    after it is created.
+    '''
+
+    def __init__(self, generics):
+        dict.__init__(self, generics)
+        self.key = tuple(sorted((name, repr(value)) for name, value in self.items()))
+
+
+def freeze_generics(generics):
+    '''
+    A hashable signature for a dictionary of generics.
+    '''
+    if isinstance(generics, FrozenGenerics):
+        key = generics.key
+    else:
+        key = tuple(sorted((name, repr(value)) for name, value in generics.items()))
+    return key
+
 
 def make_substitute_generics_function(d):
     '''
@@ -43,16 +80,46 @@ def apply_generics(generics, expression):
     '''
     Resolve generic objects in the expression.
     '''
-    substituted = make_substitute_generics_function(generics)(expression)
-    value = symbolic_math.get_value(substituted)
+    value = symbolic_math.compile_expression(expression)(generics)
     return value
 
 
-class Constant:
+class ResolvedCache(Slotted):
+    '''
+    A bounded least-recently-used store of the integer values that a type's
+    symbolic expressions (width, size, ...) take for different generics.
+    '''
+
+    __slots__ = ('maxsize', 'values')
+
+    def __init__(self, maxsize=RESOLVED_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.values = collections.OrderedDict()
+
+    def resolve(self, name, expression, generics):
+        '''
+        Get the value of `expression` with `generics` applied.
+        `name` distinguishes the different expressions of a type.
+        '''
+        key = (name, freeze_generics(generics))
+        value = self.values.get(key, None)
+        if value is None:
+            value = int(apply_generics(generics, expression))
+            self.values[key] = value
+            if len(self.values) > self.maxsize:
+                self.values.popitem(last=False)
+        else:
+            self.values.move_to_end(key)
+        return value
+
+
+class Constant(Slotted):
     '''
     A constant connected to an expression or value that defines it.
     '''
 
+    __slots__ = ('name', 'expression')
+
     def __init__(self, name, expression):
         self.name = name
         self.expression = expression
@@ -63,6 +130,9 @@ class Constant:
     def str_expression(self):
         return self.name
 
+    def compile(self):
+        return symbolic_math.compile_expression(self.expression)
+
 
 def resolve_expression(e, constants):
     '''
@@ -80,11 +150,12 @@ def resolve_expression(e, constants):
     return resolved_e
 
 
-class StdLogic:
+class StdLogic(Slotted):
     '''
     A python descriptions of the std_logic vhdl type.
     '''
 
+    __slots__ = ()
     width = 1
     resolved = True
 
@@ -107,19 +178,37 @@ class StdLogic:
         data = mapping.get(slv, None)
         return data
 
+    def decode_slv(self, slv, stop, generics):
+        '''
+        Decode the value whose least significant bit is at `slv[stop-1]`.
+        Every resolved type implements this.  It returns the value and the
+        position of its most significant bit, which is where the next
+        value stops, so that composite types are decoded without copying
+        the remainder of `slv`.
+        '''
+        return self.from_slv(slv[stop-1], generics), stop-1
+
     def reduce_slv(self, slv, generics):
-        return self.from_slv(slv[-1], generics), slv[:-1]
+        '''
+        Decode the value in the least significant bits of `slv`.  Returns
+        the value and the rest of `slv`.  This is kept for callers that used
+        it before `decode_slv`, which does not copy the rest of `slv`.
+        '''
+        data, start = self.decode_slv(slv, len(slv), generics)
+        return data, slv[:start]
 
 
 std_logic = StdLogic()
 
 
-class UnresolvedConstrainedArray:
+class UnresolvedConstrainedArray(Slotted):
     '''
     An array with a constrained length, but where the types and constants
     that define it are not yet resolved.
     '''
 
+    __slots__ = ('identifier', 'unconstrained_type', 'unconstrained_type_identifier',
+                 'type_dependencies', 'size')
     resolved = False
 
     def __init__(self, identifier, size, unconstrained_type_identifier=None,
@@ -149,12 +238,13 @@ class UnresolvedConstrainedArray:
             )
 
 
-class ConstrainedArray:
+class ConstrainedArray(Slotted):
     '''
     An array with a constrained length.  The types and constants that define
     it have been resolved.
     '''
 
+    __slots__ = ('identifier', 'unconstrained_type', 'size', 'width', 'resolved_cache')
     resolved = True
 
     def __init__(self, identifier, unconstrained_type, size, constants):
@@ -165,6 +255,7 @@ class ConstrainedArray:
             powers=(symbolic_math.Power(number=1, expression=self.size),
                     symbolic_math.Power(number=1, expression=self.unconstrained_type.subtype.width),
                    ))
+        self.resolved_cache = ResolvedCache()
 
     def __str__(self):
         s = '{}({}-1 downto 0)'.format(
@@ -173,30 +264,35 @@ class ConstrainedArray:
         return s
 
     def to_slv(self, data, generics):
-        size = apply_generics(generics, self.size)
+        size = self.resolved_cache.resolve('size', self.size, generics)
         assert len(data) == size
         slv = self.unconstrained_type.to_slv(data, generics)
         return slv
 
+    def decode_slv(self, slv, stop, generics):
+        width = self.resolved_cache.resolve('width', self.width, generics)
+        start = stop - width
+        data = self.unconstrained_type.decode_items(slv, start, stop, generics)
+        size = self.resolved_cache.resolve('size', self.size, generics)
+        assert len(data) == size
+        return data, start
+
     def reduce_slv(self, slv, generics):
-        width = int(apply_generics(generics, self.width))
-        these_slv = slv[-width:]
-        reduced_slv = slv[:-width]
-        data = self.from_slv(these_slv, generics)
-        return data, reduced_slv
+        data, start = self.decode_slv(slv, len(slv), generics)
+        return data, slv[:start]
 
     def from_slv(self, slv, generics):
-        data = self.unconstrained_type.from_slv(slv, generics)
-        size = apply_generics(generics, self.size)
-        assert len(data) == size
+        data, start = self.decode_slv(slv, len(slv), generics)
+        assert start == 0
         return data
 
 
-class UnresolvedArray:
+class UnresolvedArray(Slotted):
     '''
     An array without defined length and with types and constant unresolved.
     '''
 
+    __slots__ = ('identifier', 'subtype_identifier', 'subtype', 'type_dependencies')
     resolved = False
 
     def __init__(self, identifier, subtype_identifier=None, subtype=None):
@@ -221,38 +317,58 @@ class UnresolvedArray:
             )
 
 
-class Array:
+class Array(Slotted):
     '''
     An array without defined length and with types and constant resolved.
     '''
 
+    __slots__ = ('identifier', 'subtype', 'resolved_cache')
     resolved = True
 
     def __init__(self, identifier, subtype):
         self.identifier = identifier
         self.subtype = subtype
+        self.resolved_cache = ResolvedCache()
 
     def to_slv(self, data, generics):
         slv = ''.join([self.subtype.to_slv(d, generics) for d in reversed(data)])
         return slv
 
-    def from_slv(self, slv, generics):
-        w = apply_generics(generics, self.subtype.width)
-        intw = int(w)
-        assert intw == w
-        assert len(slv) % intw == 0
-        n = len(slv)//intw
-        assert n * intw == len(slv)
-        slv_pieces = [slv[i*intw: (i+1)*intw] for i in range(n)]
-        data = list(reversed([self.subtype.from_slv(piece, generics) for piece in slv_pieces]))
+    def decode_items(self, slv, start, stop, generics):
+        '''
+        Decode the items in `slv[start: stop]`.  The first item is in the
+        least significant bits.
+        '''
+        intw = self.resolved_cache.resolve('subtype_width', self.subtype.width, generics)
+        assert (stop - start) % intw == 0
+        data = None
+        if isinstance(self.subtype, (StdLogic, ConstrainedStdLogicVector)):
+            # Items of a fixed width scalar type are all converted at once
+            # unless there are metavalues.
+            uint = conversions.slv_to_uint(slv[start: stop])
+            if uint is not None:
+                data = conversions.uint_to_ints(
+                    uint, size=(stop - start)//intw, width=intw,
+                    signed=isinstance(self.subtype, ConstrainedSigned))
+        if data is None:
+            decode_slv = self.subtype.decode_slv
+            data = []
+            while stop > start:
+                d, stop = decode_slv(slv, stop, generics)
+                data.append(d)
         return data
 
+    def from_slv(self, slv, generics):
+        return self.decode_items(slv, 0, len(slv), generics)
+
 
 class StdLogicVector(Array):
     '''
     A python description of the std_logic_vector type.
     '''
 
+    __slots__ = ()
+
     def __init__(self):
         Array.__init__(self, identifier='std_logic_vector', subtype=std_logic)
 
@@ -263,6 +379,7 @@ class UnresolvedConstrainedStdLogicVector(StdLogicVector):
     define the length unresolved.
     '''
 
+    __slots__ = ('size', 'width')
     resolved = False
     type_dependencies = tuple()
 
@@ -282,12 +399,13 @@ class UnconstrainedStdLogicVector:
     identifier = 'std_logic_vector'
 
 
-class ConstrainedStdLogicVector:
+class ConstrainedStdLogicVector(Slotted):
     '''
     A std_logic_vector with a defined length, with the constants that
     define the length resolved.
     '''
 
+    __slots__ = ('identifier', 'size', 'width', 'resolved_cache')
     unconstrained_name = 'std_logic_vector'
     unconstrained_type = UnconstrainedStdLogicVector
 
@@ -295,6 +413,7 @@ class ConstrainedStdLogicVector:
         self.identifier = identifier
         self.size = size
         self.width = size
+        self.resolved_cache = ResolvedCache()
 
     def __str__(self):
         if self.identifier is None:
@@ -306,45 +425,41 @@ class ConstrainedStdLogicVector:
         return s
 
     def to_slv(self, data, generics):
-        size = int(apply_generics(generics, self.size))
+        size = self.resolved_cache.resolve('size', self.size, generics)
         min_value = 0
         max_value = pow(2, size)-1
         assert(data >= min_value)
         assert(data <= max_value)
-        bits = []
-        for i in range(size):
-            bits.append(data % 2)
-            data = data >> 1
-        assert(data == 0)
-        slv = ''.join([std_logic.to_slv(b, generics) for b in reversed(bits)])
+        slv = conversions.uint_to_slv(data, size)
         return slv
 
+    def decode_slv(self, slv, stop, generics):
+        width = self.resolved_cache.resolve('width', self.width, generics)
+        start = stop - width
+        data = self.from_slv(slv[start: stop], generics)
+        return data, start
+
     def reduce_slv(self, slv, generics):
-        width = int(apply_generics(generics, self.width))
-        these_slv = slv[-width:]
-        reduced_slv = slv[:-width]
-        data = self.from_slv(these_slv, generics)
-        return data, reduced_slv
+        data, start = self.decode_slv(slv, len(slv), generics)
+        return data, slv[:start]
 
     def from_slv(self, slv, generics):
-        bits = [std_logic.from_slv(c, generics) for c in slv]
-        data = 0
-        for b in bits:
-            if (b is None) or (data is None):
-                data = None
-            else:
-                data = (data << 1) + b
+        data = conversions.slv_to_uint(slv)
         return data
 
 
 class Unsigned(StdLogicVector):
 
+    __slots__ = ()
+
     def __init__(self):
         Array.__init__(self, identifier='unsigned', subtype=std_logic)
 
 
 class UnresolvedConstrainedUnsigned(UnresolvedConstrainedStdLogicVector):
 
+    __slots__ = ()
+
     def resolve(self, types, constants):
         size = resolve_expression(self.size, constants)
         return ConstrainedUnsigned(
@@ -353,17 +468,22 @@ class UnresolvedConstrainedUnsigned(UnresolvedConstrainedStdLogicVector):
 
 class ConstrainedUnsigned(ConstrainedStdLogicVector):
 
+    __slots__ = ()
     unconstrained_name = 'unsigned'
 
 
 class Signed(StdLogicVector):
 
+    __slots__ = ()
+
     def __init__(self):
         Array.__init__(self, identifier='signed', subtype=std_logic)
 
 
 class UnresolvedConstrainedSigned(UnresolvedConstrainedStdLogicVector):
 
+    __slots__ = ()
+
     def resolve(self, types, constants):
         size = resolve_expression(self.size, constants)
         return ConstrainedSigned(
@@ -372,6 +492,7 @@ class UnresolvedConstrainedSigned(UnresolvedConstrainedStdLogicVector):
 
 class ConstrainedSigned(ConstrainedStdLogicVector):
 
+    __slots__ = ('max_value', 'min_value')
     resolved = True
     unconstrained_name = 'signed'
 
@@ -379,6 +500,7 @@ class ConstrainedSigned(ConstrainedStdLogicVector):
         self.identifier = identifier
         self.size = size
         self.width = size
+        self.resolved_cache = ResolvedCache()
         size_value = symbolic_math.get_value(size)
         self.max_value = pow(2, size_value-1)-1
         self.min_value = -pow(2, size_value-1)
@@ -386,14 +508,14 @@ class ConstrainedSigned(ConstrainedStdLogicVector):
     def to_slv(self, data, generics):
         assert(data >= self.min_value)
         assert(data <= self.max_value)
-        size = apply_generics(generics, self.size)
+        size = self.resolved_cache.resolve('size', self.size, generics)
         if data < 0:
             data += pow(2, size)
         slv = ConstrainedUnsigned.to_slv(self, data, generics)
         return slv
 
     def from_slv(self, slv, generics):
-        size = apply_generics(generics, self.size)
+        size = self.resolved_cache.resolve('size', self.size, generics)
         data = ConstrainedUnsigned.from_slv(self, slv, generics)
         if data is not None:
             if data > self.max_value:
@@ -419,8 +541,9 @@ def type_width_constant(typ):
     return width
 
 
-class UnresolvedRecord:
+class UnresolvedRecord(Slotted):
 
+    __slots__ = ('identifier', 'names_and_subtypes', 'type_dependencies')
     resolved = False
 
     def __init__(self, identifier, names_and_subtypes):
@@ -450,8 +573,9 @@ class UnresolvedRecord:
             )
 
 
-class Record:
+class Record(Slotted):
 
+    __slots__ = ('identifier', 'names_and_subtypes', 'width')
     resolved = True
 
     def __init__(self, identifier, names_and_subtypes):
@@ -470,16 +594,19 @@ class Record:
         slv = ''.join(reversed(slvs))
         return slv
 
-    def reduce_slv(self, slv, generics):
-        reduced_slv = slv
+    def decode_slv(self, slv, stop, generics):
         data = {}
         for name, subtype in self.names_and_subtypes:
-            data[name], reduced_slv = subtype.reduce_slv(reduced_slv, generics)
-        return data, reduced_slv
+            data[name], stop = subtype.decode_slv(slv, stop, generics)
+        return data, stop
+
+    def reduce_slv(self, slv, generics):
+        data, start = self.decode_slv(slv, len(slv), generics)
+        return data, slv[:start]
 
     def from_slv(self, slv, generics):
-        data, reduced_slv = self.reduce_slv(slv, generics)
-        assert(reduced_slv == '')
+        data, start = self.decode_slv(slv, len(slv), generics)
+        assert(start == 0)
         return data
 
     def declaration(self):
@@ -491,8 +618,9 @@ class Record:
         return '\n'.join(lines)
 
 
-class Enumeration:
+class Enumeration(Slotted):
 
+    __slots__ = ('identifier', 'literals', 'width', 'slvs_by_literal', 'literals_by_slv')
     resolved = True
     type_dependencies = tuple()
 
@@ -500,27 +628,39 @@ class Enumeration:
         self.identifier = identifier
         self.literals = [l.lower() for l in literals]
         self.width = symbolic_math.logceil(len(literals))
+        # Lookup tables between the literals and their std_logic_vectors.
+        # Codes that are out of range or contain metavalues are not in
+        # `literals_by_slv` and decode to None.
+        self.slvs_by_literal = dict(
+            (literal, conversions.uint_to_slv(index, self.width))
+            for index, literal in enumerate(self.literals))
+        self.literals_by_slv = dict(
+            (slv, literal) for literal, slv in self.slvs_by_literal.items())
 
     def __str__(self):
         return self.identifier
 
     def to_slv(self, data, generics):
-        if data.lower() not in self.literals:
-            raise Exception('Enumeration does not contain {}. Options are {}'.format(
-                data.lower(), self.literals))
-        index = self.literals.index(data.lower())
-        slv = conversions.uint_to_slv(index, self.width)
+        slv = self.slvs_by_literal.get(data, None)
+        if slv is None:
+            slv = self.slvs_by_literal.get(data.lower(), None)
+            if slv is None:
+                raise Exception('Enumeration does not contain {}. Options are {}'.format(
+                    data.lower(), self.literals))
         return slv
 
+    def decode_slv(self, slv, stop, generics):
+        start = stop - self.width
+        data = self.literals_by_slv.get(slv[start: stop], None)
+        return data, start
+
     def reduce_slv(self, slv, generics):
-        reduced_slv = slv[:-self.width]
-        index = conversions.slv_to_uint(slv[-self.width:])
-        data = self.literals[index]
-        return data, reduced_slv
+        data, start = self.decode_slv(slv, len(slv), generics)
+        return data, slv[:start]
 
     def from_slv(self, slv, generics):
-        data, reduced_slv = self.reduce_slv(slv, generics)
-        assert(reduced_slv == '')
+        data, start = self.decode_slv(slv, len(slv), generics)
+        assert(start == 0)
         return data
 
     def declaration(self):
@@ -0,0 +1,95 @@
+-- -*- vhdl -*- 
+
+-- Like ReadFile but each line is in the hex line format.
+-- Each group of four bits is a hex digit.  A group that is all the same
+-- metavalue is that metavalue character and any other group is '#'
+-- followed by its four characters.  The leftmost group is padded.
+
+library ieee;
+use ieee.std_logic_1164.all;
+
+library vunit_lib;
+context vunit_lib.vunit_context;
+
+library std;
+use std.textio;
+use work.txt_util.all;
+
+entity ReadHexFile is
+  generic (FILENAME: string;
+           PASSED_RUNNER_CFG: string;
+           WIDTH: positive);
+  port (clk: in std_logic;
+        out_data: out std_logic_vector(0 to WIDTH-1));
+end ReadHexFile;
+
+architecture arch of ReadHexFile is
+  constant N_NIBBLES: positive := (WIDTH+3)/4;
+  file input_file : textio.text;
+  signal the_out_data: std_logic_vector(0 to WIDTH-1) := (others => '0');
+
+  function hex_to_nibble(c: character) return std_logic_vector is
+    variable nibble: std_logic_vector(3 downto 0);
+  begin
+    case c is
+      when '0' => nibble := "0000";
+      when '1' => nibble := "0001";
+      when '2' => nibble := "0010";
+      when '3' => nibble := "0011";
+      when '4' => nibble := "0100";
+      when '5' => nibble := "0101";
+      when '6' => nibble := "0110";
+      when '7' => nibble := "0111";
+      when '8' => nibble := "1000";
+      when '9' => nibble := "1001";
+      when 'A' | 'a' => nibble := "1010";
+      when 'B' | 'b' => nibble := "1011";
+      when 'C' | 'c' => nibble := "1100";
+      when 'D' | 'd' => nibble := "1101";
+      when 'E' | 'e' => nibble := "1110";
+      when 'F' | 'f' => nibble := "1111";
+      when others => nibble := (others => to_std_logic(c));
+    end case;
+    return nibble;
+  end function;
+
+begin
+  out_data <= the_out_data;
+  process
+    variable input_line : textio.line;
+    variable c: character;
+    variable padded: std_logic_vector(4*N_NIBBLES-1 downto 0);
+    variable counter: natural := 0;
+  begin
+    test_runner_setup(runner, PASSED_RUNNER_CFG);
+
+    textio.file_open(input_file, FILENAME, read_mode);
+
+    while not textio.endfile(input_file) loop
+      wait until rising_edge(clk);
+      textio.readline(input_file, input_line);
+      for n in N_NIBBLES-1 downto 0 loop
+        textio.read(input_line, c);
+        if c = '#' then
+          for b in 3 downto 0 loop
+            textio.read(input_line, c);
+            padded(4*n+b) := to_std_logic(c);
+          end loop;
+        else
+          padded(4*n+3 downto 4*n) := hex_to_nibble(c);
+        end if;
+      end loop;
+      the_out_data <= padded(WIDTH-1 downto 0);
+    end loop;
+
+    textio.file_close(input_file);
+
+    while counter < 40 loop
+      counter := counter + 1;
+      wait until rising_edge(clk);
+    end loop;  
+
+    test_runner_cleanup(runner);
+  end process;
+
+end arch;
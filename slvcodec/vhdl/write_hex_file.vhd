@@ -0,0 +1,73 @@
+-- -*- vhdl -*- 
+
+-- Like WriteFile but each line is written in the hex line format
+-- that ReadHexFile reads.
+
+library ieee;
+use ieee.std_logic_1164.all;
+
+library std;
+use std.textio;
+use work.txt_util.all;
+
+entity WriteHexFile is
+  generic (FILENAME: string;
+           WIDTH: positive);
+  port (clk: in std_logic;
+        in_data: in std_logic_vector(0 to WIDTH-1));
+end WriteHexFile;
+
+architecture arch of WriteHexFile is
+  constant N_NIBBLES: positive := (WIDTH+3)/4;
+  file output_file : textio.text;
+
+  function nibble_to_hex(nibble: std_logic_vector(3 downto 0)) return string is
+    variable value: natural := 0;
+    variable is_binary: boolean := true;
+    variable is_uniform: boolean := true;
+  begin
+    for b in 3 downto 0 loop
+      if nibble(b) = '1' then
+        value := value * 2 + 1;
+      elsif nibble(b) = '0' then
+        value := value * 2;
+      else
+        is_binary := false;
+      end if;
+      if nibble(b) /= nibble(3) then
+        is_uniform := false;
+      end if;
+    end loop;
+    if is_binary then
+      return (1 => chr(value));
+    elsif is_uniform then
+      return (1 => chr(nibble(3)));
+    else
+      return "#" & str(nibble);
+    end if;
+  end function;
+
+begin
+  process
+    variable output_line : textio.line;
+    variable padded: std_logic_vector(4*N_NIBBLES-1 downto 0);
+  begin
+
+    textio.file_open(output_file, FILENAME, write_mode);
+
+    while true loop
+      wait until rising_edge(clk);
+      padded := (others => in_data(0));
+      padded(WIDTH-1 downto 0) := in_data;
+      for n in N_NIBBLES-1 downto 0 loop
+        textio.write(output_line, nibble_to_hex(padded(4*n+3 downto 4*n)));
+      end loop;
+      textio.writeline(output_file, output_line);
+    end loop;
+
+    textio.file_close(output_file);
+
+    wait;
+  end process;
+
+end arch;
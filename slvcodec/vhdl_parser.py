@@ -15,38 +15,89 @@ VHDL parsing functionality
 import re
 from os.path import abspath
 import logging
-from vunit.cached import cached
+from vunit.hashing import hash_string
+from vunit.ostools import read_file
 from vunit.parsing.encodings import HDL_FILE_ENCODING
+from slvcodec.slotted import Slotted
 LOGGER = logging.getLogger(__name__)
 
 
+def read_code(file_name):
+    """
+    Read the contents of a VHDL file
+    """
+    return read_file(abspath(file_name), encoding=HDL_FILE_ENCODING)
+
+
 class VHDLParser(object):
     """
     Parse a single VHDL file, caching the result to a database if available
+
+    Results are keyed by a hash of the file contents so unchanged files are
+    never parsed twice.  They are also kept in memory for the life of the
+    parser.
     """
 
     def __init__(self, database=None):
         self._database = database
-        if database is not None:
-            assert False
+        self._memory = {}
+
+    @staticmethod
+    def _cache_key(code):
+        # The hash of the slvcodec source is part of the key so that results
+        # pickled by a different version of the parser, or of the slots of
+        # the result classes, are not reused.
+        from slvcodec.filetestbench_generator import slvcodec_hash
+        return "slvcodec.VHDLParser.parse(source={}, hash={})".format(
+            slvcodec_hash(), hash_string(code)).encode()
+
+    def lookup(self, code):
+        """
+        Return the cached VHDLDesignFile for the code or None if it has not
+        been parsed before
+        """
+        key = self._cache_key(code)
+        result = self._memory.get(key, None)
+        if (result is None) and (self._database is not None) and (key in self._database):
+            result = self._database[key]
+            self._memory[key] = result
+        return result
+
+    def store(self, code, result):
+        """
+        Cache the VHDLDesignFile that was parsed from the code
+        """
+        key = self._cache_key(code)
+        self._memory[key] = result
+        if self._database is not None:
+            self._database[key] = result
+
+    def parse_code(self, code):
+        """
+        Parse the VHDL code re-using a cached result if available
+        """
+        result = self.lookup(code)
+        if result is None:
+            result = VHDLDesignFile.parse(code)
+            self.store(code, result)
+        return result
 
     def parse(self, file_name):
         """
         Parse the VHDL code and return a VHDLDesignFile parse result
         parse result is re-used if content hash found in database
         """
-        file_name = abspath(file_name)
-        return cached("CachedVHDLParser.parse",
-                      VHDLDesignFile.parse,
-                      file_name,
-                      encoding=HDL_FILE_ENCODING,
-                      database=self._database)
+        code = read_code(file_name)
+        return self.parse_code(code)
 
 
-class VHDLDesignFile(object):  # pylint: disable=too-many-instance-attributes
+class VHDLDesignFile(Slotted):  # pylint: disable=too-many-instance-attributes
     """
     Contains VHDL objects found within a file
     """
+    __slots__ = ('entities', 'packages', 'package_bodies', 'architectures', 'contexts',
+                 'component_instantiations', 'configurations', 'references')
+
     def __init__(self,  # pylint: disable=too-many-arguments
                  entities=None,
                  packages=None,
@@ -94,10 +145,12 @@ class VHDLDesignFile(object):  # pylint: disable=too-many-instance-attributes
         return [comp_name for comp_name in matches]
 
 
-class VHDLPackageBody(object):
+class VHDLPackageBody(Slotted):
     """
     Representation of a VHDL package body
     """
+    __slots__ = ('identifier',)
+
     def __init__(self, identifier):
         self.identifier = identifier
 
@@ -122,10 +175,12 @@ class VHDLPackageBody(object):
             yield VHDLPackageBody(match.group('package'))
 
 
-class VHDLConfiguration(object):
+class VHDLConfiguration(Slotted):
     """
     A configuratio declaration
     """
+    __slots__ = ('identifier', 'entity')
+
     def __init__(self, identifier, entity):
         self.identifier = identifier
         self.entity = entity
@@ -152,10 +207,12 @@ class VHDLConfiguration(object):
         return [cls(match.group('id'), match.group('entity_id')) for match in matches]
 
 
-class VHDLArchitecture(object):
+class VHDLArchitecture(Slotted):
     """
     Representation of a VHDL architecture
     """
+    __slots__ = ('identifier', 'entity')
+
     def __init__(self, identifier, entity):
         self.identifier = identifier
         self.entity = entity
@@ -187,10 +244,13 @@ PACKAGE_INSTANCE_PATTERN = (
     r'\bpackage\s+(?P<new_name>[a-zA-Z]\w*)\s+is\s+new\s+(?P<lib>[a-zA-Z]\w*)\.(?P<name>[a-zA-Z]\w*)')
 
 
-class VHDLPackage(object):
+class VHDLPackage(Slotted):
     """
     Representation of a VHDL package
     """
+    __slots__ = ('identifier', 'enumeration_types', 'record_types', 'array_types',
+                 'subtypes', 'constants')
+
     def __init__(self,  # pylint: disable=too-many-arguments
                  identifier, enumeration_types, record_types, array_types,
                  subtypes, constants):
@@ -269,10 +329,12 @@ class VHDLPackage(object):
                    subtypes, constants)
 
 
-class VHDLEntity(object):
+class VHDLEntity(Slotted):
     """
     Represents a VHDL Entity
     """
+    __slots__ = ('identifier', 'generics', 'ports')
+
     def __init__(self, identifier, generics=None, ports=None):
         self.identifier = identifier
 
@@ -487,10 +549,12 @@ class VHDLEntity(object):
         return port_list
 
 
-class VHDLContext(object):
+class VHDLContext(Slotted):
     """
     Represents a VHDL 2008 context
     """
+    __slots__ = ('identifier',)
+
     def __init__(self, identifier):
         self.identifier = identifier
 
@@ -513,10 +577,12 @@ class VHDLContext(object):
             yield VHDLContext(identifier=identifier)
 
 
-class VHDLSubtypeIndication(object):
+class VHDLSubtypeIndication(Slotted):
     """
     Represents a VHDL subtype indication
     """
+    __slots__ = ('code', 'type_mark', 'constraint', 'array_type')
+
     def __init__(self, code, type_mark, constraint, array_type):
         self.code = code
         self.type_mark = type_mark
@@ -548,10 +614,12 @@ class VHDLSubtypeIndication(object):
         return self.code
 
 
-class VHDLInterfaceElement(object):
+class VHDLInterfaceElement(Slotted):
     """
     Represents a VHDL interface element
     """
+    __slots__ = ('identifier', 'mode', 'subtype_indication', 'init_value')
+
     def __init__(self, identifier, subtype_indication, mode=None, init_value=None):
         self.identifier = identifier
         self.mode = mode
@@ -620,8 +688,10 @@ class VHDLInterfaceElement(object):
         return code
 
 
-class VHDLEnumerationType(object):
+class VHDLEnumerationType(Slotted):
     """Represents a VHDL enumeration type"""
+    __slots__ = ('identifier', 'literals')
+
     def __init__(self, identifier, literals):
         self.identifier = identifier
         self.literals = literals
@@ -646,15 +716,19 @@ class VHDLEnumerationType(object):
             yield cls(identifier, literals)
 
 
-class VHDLElementDeclaration(object):
+class VHDLElementDeclaration(Slotted):
     """Represents a VHDL element declaration"""
+    __slots__ = ('identifier_list', 'subtype_indication')
+
     def __init__(self, identifier_list, subtype_indication):
         self.identifier_list = identifier_list
         self.subtype_indication = subtype_indication
 
 
-class VHDLRecordType(object):
+class VHDLRecordType(Slotted):
     """Represents a VHDL record type"""
+    __slots__ = ('identifier', 'elements')
+
     def __init__(self, identifier, elements):
         self.identifier = identifier
         self.elements = elements
@@ -685,8 +759,10 @@ class VHDLRecordType(object):
             yield cls(identifier, parsed_elements)
 
 
-class VHDLRange(object):
+class VHDLRange(Slotted):
     """Represents a VHDL Range"""
+    __slots__ = ('range_type', 'left', 'right', 'attribute', 'direction')
+
     def __init__(self, range_type=None, left=None, right=None, attribute=None, direction=None):
         self.range_type = range_type
         self.left = left
@@ -772,8 +848,10 @@ class RangeParser(object):
         return VHDLRange()
 
 
-class VHDLArrayType(object):
+class VHDLArrayType(Slotted):
     """Represents a VHDL array type"""
+    __slots__ = ('identifier', 'subtype_indication', 'range1', 'range2')
+
     def __init__(self, identifier, subtype_indication, range1, range2):
         self.identifier = identifier
         self.subtype_indication = subtype_indication
@@ -808,8 +886,10 @@ class VHDLArrayType(object):
             yield cls(identifier, subtype_indication, range1, range2)
 
 
-class VHDLSubtype(object):
+class VHDLSubtype(Slotted):
     """Represents a VHDL subtype"""
+    __slots__ = ('identifier', 'subtype_indication', 'range1', 'range2')
+
     def __init__(self, identifier, subtype_indication, range1, range2):
         self.identifier = identifier
         self.subtype_indication = subtype_indication
@@ -849,8 +929,11 @@ class VHDLSubtype(object):
             yield cls(identifier, subtype_indication, range1, range2)
 
 
-class VHDLConstant(object):
+class VHDLConstant(Slotted):
     """Represents a VHDL constant"""
+
+    __slots__ = ('identifier', 'type_indication', 'text')
+
     def __init__(self, identifier, type_indication, text):
         self.identifier = identifier
         self.type_indication = type_indication
@@ -900,10 +983,13 @@ def find_closing_delimiter(start, end, code):
     raise ValueError('Failed to find closing delimiter to ' + start + ' in ' + code + '.')
 
 
-class VHDLReference(object):
+class VHDLReference(Slotted):
     """
     Reference to design unit
     """
+
+    __slots__ = ('reference_type', 'library', 'design_unit', 'name_within')
+
     _reference_types = ("package",
                         "context",
                         "entity",
@@ -0,0 +1,153 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use work.slvcodec.all;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use work.vhdl_type_pkg.all;
+use work.vhdl_type_pkg_slvcodec.all;
+
+entity dummy_tb is
+  generic (
+    length: natural;
+    CLOCK_PERIOD: time := 10 ns;
+    RUNNER_CFG: string;
+    OUTPUT_PATH: string
+  );
+end entity;
+ 
+architecture arch of dummy_tb is
+  type t_input is
+record
+    reset: std_logic;
+    i_valid: std_logic;
+    i_dummy: t_dummy;
+    i_datas: array_of_data(3-1 downto 0);
+end record;
+type t_output is
+record
+    o_data: array_of_data(length-1 downto 0);
+    o_firstdata: t_data;
+    o_firstdatabit: std_logic;
+end record;
+  constant t_input_slvcodecwidth: natural := (size*width+4*width+7);
+  function to_slvcodec (constant data: t_input) return std_logic_vector;
+  function from_slvcodec (constant slv: std_logic_vector) return t_input;
+  function to_slvcodec (constant data: t_input) return std_logic_vector is
+    constant W0: natural := 0;
+    constant W1: natural := W0 + 1;
+    constant W2: natural := W1 + 1;
+    constant W3: natural := W2 + (size*width+width+5);
+    constant W4: natural := W3 + 3*width;
+    variable slv: std_logic_vector(t_input_slvcodecwidth-1 downto 0);
+  begin
+    slv(W1-1 downto W0) := to_slvcodec(data.reset);
+    slv(W2-1 downto W1) := to_slvcodec(data.i_valid);
+    slv(W3-1 downto W2) := to_slvcodec(data.i_dummy);
+    slv(W4-1 downto W3) := to_slvcodec(data.i_datas);
+    return slv; 
+  end function;
+
+  function from_slvcodec (constant slv: std_logic_vector) return t_input is
+    constant W0: natural := 0;
+    constant W1: natural := W0 + 1;
+    constant W2: natural := W1 + 1;
+    constant W3: natural := W2 + (size*width+width+5);
+    constant W4: natural := W3 + 3*width;
+    variable data: t_input;
+    variable mapped: std_logic_vector(t_input_slvcodecwidth-1 downto 0);
+  begin
+    mapped := slv;
+    data.reset := from_slvcodec(mapped(W1-1 downto W0)); 
+    data.i_valid := from_slvcodec(mapped(W2-1 downto W1)); 
+    data.i_dummy := from_slvcodec(mapped(W3-1 downto W2)); 
+    data.i_datas := from_slvcodec(mapped(W4-1 downto W3)); 
+    return data; 
+  end function;
+  constant t_output_slvcodecwidth: natural := (length*width+width+1);
+  function to_slvcodec (constant data: t_output) return std_logic_vector;
+  function from_slvcodec (constant slv: std_logic_vector) return t_output;
+  function to_slvcodec (constant data: t_output) return std_logic_vector is
+    constant W0: natural := 0;
+    constant W1: natural := W0 + length*width;
+    constant W2: natural := W1 + width;
+    constant W3: natural := W2 + 1;
+    variable slv: std_logic_vector(t_output_slvcodecwidth-1 downto 0);
+  begin
+    slv(W1-1 downto W0) := to_slvcodec(data.o_data);
+    slv(W2-1 downto W1) := to_slvcodec(data.o_firstdata);
+    slv(W3-1 downto W2) := to_slvcodec(data.o_firstdatabit);
+    return slv; 
+  end function;
+
+  function from_slvcodec (constant slv: std_logic_vector) return t_output is
+    constant W0: natural := 0;
+    constant W1: natural := W0 + length*width;
+    constant W2: natural := W1 + width;
+    constant W3: natural := W2 + 1;
+    variable data: t_output;
+    variable mapped: std_logic_vector(t_output_slvcodecwidth-1 downto 0);
+  begin
+    mapped := slv;
+    data.o_data := from_slvcodec(mapped(W1-1 downto W0)); 
+    data.o_firstdata := from_slvcodec(mapped(W2-1 downto W1)); 
+    data.o_firstdatabit := from_slvcodec(mapped(W3-1 downto W2)); 
+    return data; 
+  end function;
+  signal input_data: t_input;
+  signal output_data: t_output;
+  signal input_slv: std_logic_vector(t_input_slvcodecwidth-1 downto 0);
+  signal output_slv: std_logic_vector(t_output_slvcodecwidth-1 downto 0);
+  signal clk: std_logic;
+  signal read_clk: std_logic;
+  signal write_clk: std_logic;
+begin
+
+  input_data <= from_slvcodec(input_slv);
+  output_slv <= to_slvcodec(output_data);
+
+  file_reader: entity work.ReadFile
+    generic map(FILENAME => OUTPUT_PATH & "/indata.dat",
+                PASSED_RUNNER_CFG => RUNNER_CFG,
+                WIDTH => t_input_slvcodecwidth)
+    port map(clk => read_clk,
+             out_data => input_slv);
+
+  file_writer: entity work.WriteFile
+    generic map(FILENAME => OUTPUT_PATH & "/outdata.dat",
+                WIDTH => t_output_slvcodecwidth)
+    port map(clk => write_clk,
+             in_data => output_slv);
+
+  clock_generator: entity work.ClockGenerator
+    generic map(CLOCK_PERIOD => CLOCK_PERIOD,
+                CLOCK_OFFSET => 0 ns
+                )
+    port map(clk => clk);
+
+  read_clock_generator: entity work.ClockGenerator
+    generic map(CLOCK_PERIOD => CLOCK_PERIOD,
+                CLOCK_OFFSET => CLOCK_PERIOD/10
+                )
+    port map(clk => read_clk);
+
+  write_clock_generator: entity work.ClockGenerator
+    generic map(CLOCK_PERIOD => CLOCK_PERIOD,
+                CLOCK_OFFSET => 4*CLOCK_PERIOD/10
+                )
+    port map(clk => write_clk);
+
+  dut: entity work.dummy
+    generic map(
+      length => length
+      )
+    port map(clk => clk,
+             reset => input_data.reset,
+i_valid => input_data.i_valid,
+i_dummy => input_data.i_dummy,
+o_data => output_data.o_data,
+i_datas => input_data.i_datas,
+o_firstdata => output_data.o_firstdata,
+o_firstdatabit => output_data.o_firstdatabit
+             );
+ 
+end architecture;
\ No newline at end of file
@@ -0,0 +1,44 @@
+library ieee;
+library work;
+use work.vhdl_type_pkg.all;
+use work.vhdl_type_pkg_slvcodec.all;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use work.test_pkg.all;
+use work.slvcodec.all;
+
+package test_pkg_slvcodec is
+
+
+  function to_slvcodec (constant data: differnt_array_of_data) return std_logic_vector;
+  function from_slvcodec (constant slv: std_logic_vector) return differnt_array_of_data;
+
+end package;
+
+package body test_pkg_slvcodec is
+
+  function to_slvcodec (constant data: differnt_array_of_data) return std_logic_vector is
+    constant W: natural := t_data_slvcodecwidth;
+    constant N: natural := data'length;
+    variable slv: std_logic_vector(N*W-1 downto 0);
+  begin
+    for ii in 0 to N-1 loop
+      slv((ii+1)*W-1 downto ii*W) := to_slvcodec(data(ii));
+    end loop;
+    return slv; 
+  end function;
+
+  function from_slvcodec (constant slv: std_logic_vector) return differnt_array_of_data is
+    constant W: natural := t_data_slvcodecwidth;
+    constant N: natural := slv'length/W;
+    variable mapped: std_logic_vector(slv'length-1 downto 0);
+    variable output: differnt_array_of_data(N-1 downto 0);
+  begin
+    mapped := slv;
+    for ii in 0 to N-1 loop
+      output(ii) := from_slvcodec(mapped((ii+1)*W-1 downto ii*W));
+    end loop;
+    return output; 
+  end function;
+
+end package body;
@@ -0,0 +1,187 @@
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use work.vhdl_type_pkg.all;
+use work.slvcodec.all;
+
+package vhdl_type_pkg_slvcodec is
+
+  constant t_anunsigned_slvcodecwidth: natural := 6;
+  constant t_asigned_slvcodecwidth: natural := 6;
+  constant t_data_slvcodecwidth: natural := width;
+
+  function to_slvcodec (constant data: array_of_unsigned) return std_logic_vector;
+  function from_slvcodec (constant slv: std_logic_vector) return array_of_unsigned;
+
+  function to_slvcodec (constant data: array_of_signed) return std_logic_vector;
+  function from_slvcodec (constant slv: std_logic_vector) return array_of_signed;
+
+  function to_slvcodec (constant data: array_of_data) return std_logic_vector;
+  function from_slvcodec (constant slv: std_logic_vector) return array_of_data;
+  constant array_of_array_of_unsigned_slvcodecwidth: natural := 6*4*6;
+  function to_slvcodec (constant data: array_of_array_of_unsigned) return std_logic_vector;
+  function from_slvcodec (constant slv: std_logic_vector) return array_of_array_of_unsigned;
+  constant array_of_array_of_signed_slvcodecwidth: natural := 6*4*6;
+  function to_slvcodec (constant data: array_of_array_of_signed) return std_logic_vector;
+  function from_slvcodec (constant slv: std_logic_vector) return array_of_array_of_signed;
+  constant t_manydata_slvcodecwidth: natural := size*width;
+  constant t_dummy_slvcodecwidth: natural := (size*width+width+5);
+  function to_slvcodec (constant data: t_dummy) return std_logic_vector;
+  function from_slvcodec (constant slv: std_logic_vector) return t_dummy;
+
+end package;
+
+package body vhdl_type_pkg_slvcodec is
+
+
+
+
+  function to_slvcodec (constant data: array_of_unsigned) return std_logic_vector is
+    constant W: natural := t_anunsigned_slvcodecwidth;
+    constant N: natural := data'length;
+    variable slv: std_logic_vector(N*W-1 downto 0);
+  begin
+    for ii in 0 to N-1 loop
+      slv((ii+1)*W-1 downto ii*W) := to_slvcodec(data(ii));
+    end loop;
+    return slv; 
+  end function;
+
+  function from_slvcodec (constant slv: std_logic_vector) return array_of_unsigned is
+    constant W: natural := t_anunsigned_slvcodecwidth;
+    constant N: natural := slv'length/W;
+    variable mapped: std_logic_vector(slv'length-1 downto 0);
+    variable output: array_of_unsigned(N-1 downto 0);
+  begin
+    mapped := slv;
+    for ii in 0 to N-1 loop
+      output(ii) := from_slvcodec(mapped((ii+1)*W-1 downto ii*W));
+    end loop;
+    return output; 
+  end function;
+  function to_slvcodec (constant data: array_of_signed) return std_logic_vector is
+    constant W: natural := t_asigned_slvcodecwidth;
+    constant N: natural := data'length;
+    variable slv: std_logic_vector(N*W-1 downto 0);
+  begin
+    for ii in 0 to N-1 loop
+      slv((ii+1)*W-1 downto ii*W) := to_slvcodec(data(ii));
+    end loop;
+    return slv; 
+  end function;
+
+  function from_slvcodec (constant slv: std_logic_vector) return array_of_signed is
+    constant W: natural := t_asigned_slvcodecwidth;
+    constant N: natural := slv'length/W;
+    variable mapped: std_logic_vector(slv'length-1 downto 0);
+    variable output: array_of_signed(N-1 downto 0);
+  begin
+    mapped := slv;
+    for ii in 0 to N-1 loop
+      output(ii) := from_slvcodec(mapped((ii+1)*W-1 downto ii*W));
+    end loop;
+    return output; 
+  end function;
+  function to_slvcodec (constant data: array_of_data) return std_logic_vector is
+    constant W: natural := t_data_slvcodecwidth;
+    constant N: natural := data'length;
+    variable slv: std_logic_vector(N*W-1 downto 0);
+  begin
+    for ii in 0 to N-1 loop
+      slv((ii+1)*W-1 downto ii*W) := to_slvcodec(data(ii));
+    end loop;
+    return slv; 
+  end function;
+
+  function from_slvcodec (constant slv: std_logic_vector) return array_of_data is
+    constant W: natural := t_data_slvcodecwidth;
+    constant N: natural := slv'length/W;
+    variable mapped: std_logic_vector(slv'length-1 downto 0);
+    variable output: array_of_data(N-1 downto 0);
+  begin
+    mapped := slv;
+    for ii in 0 to N-1 loop
+      output(ii) := from_slvcodec(mapped((ii+1)*W-1 downto ii*W));
+    end loop;
+    return output; 
+  end function;
+  function to_slvcodec (constant data: array_of_array_of_unsigned) return std_logic_vector is
+    constant W: natural := 4*6;
+    constant N: natural := data'length;
+    variable slv: std_logic_vector(N*W-1 downto 0);
+  begin
+    for ii in 0 to N-1 loop
+      slv((ii+1)*W-1 downto ii*W) := to_slvcodec(data(ii));
+    end loop;
+    return slv; 
+  end function;
+
+  function from_slvcodec (constant slv: std_logic_vector) return array_of_array_of_unsigned is
+    constant W: natural := 4*6;
+    constant N: natural := slv'length/W;
+    variable mapped: std_logic_vector(slv'length-1 downto 0);
+    variable output: array_of_array_of_unsigned;
+  begin
+    mapped := slv;
+    for ii in 0 to N-1 loop
+      output(ii) := from_slvcodec(mapped((ii+1)*W-1 downto ii*W));
+    end loop;
+    return output; 
+  end function;
+  function to_slvcodec (constant data: array_of_array_of_signed) return std_logic_vector is
+    constant W: natural := 4*6;
+    constant N: natural := data'length;
+    variable slv: std_logic_vector(N*W-1 downto 0);
+  begin
+    for ii in 0 to N-1 loop
+      slv((ii+1)*W-1 downto ii*W) := to_slvcodec(data(ii));
+    end loop;
+    return slv; 
+  end function;
+
+  function from_slvcodec (constant slv: std_logic_vector) return array_of_array_of_signed is
+    constant W: natural := 4*6;
+    constant N: natural := slv'length/W;
+    variable mapped: std_logic_vector(slv'length-1 downto 0);
+    variable output: array_of_array_of_signed;
+  begin
+    mapped := slv;
+    for ii in 0 to N-1 loop
+      output(ii) := from_slvcodec(mapped((ii+1)*W-1 downto ii*W));
+    end loop;
+    return output; 
+  end function;
+
+  function to_slvcodec (constant data: t_dummy) return std_logic_vector is
+    constant W0: natural := 0;
+    constant W1: natural := W0 + size*width;
+    constant W2: natural := W1 + width;
+    constant W3: natural := W2 + 1;
+    constant W4: natural := W3 + 4;
+    variable slv: std_logic_vector(t_dummy_slvcodecwidth-1 downto 0);
+  begin
+    slv(W1-1 downto W0) := to_slvcodec(data.manydata);
+    slv(W2-1 downto W1) := to_slvcodec(data.data);
+    slv(W3-1 downto W2) := to_slvcodec(data.logic);
+    slv(W4-1 downto W3) := to_slvcodec(data.slv);
+    return slv; 
+  end function;
+
+  function from_slvcodec (constant slv: std_logic_vector) return t_dummy is
+    constant W0: natural := 0;
+    constant W1: natural := W0 + size*width;
+    constant W2: natural := W1 + width;
+    constant W3: natural := W2 + 1;
+    constant W4: natural := W3 + 4;
+    variable data: t_dummy;
+    variable mapped: std_logic_vector(t_dummy_slvcodecwidth-1 downto 0);
+  begin
+    mapped := slv;
+    data.manydata := from_slvcodec(mapped(W1-1 downto W0)); 
+    data.data := from_slvcodec(mapped(W2-1 downto W1)); 
+    data.logic := from_slvcodec(mapped(W3-1 downto W2)); 
+    data.slv := from_slvcodec(mapped(W4-1 downto W3)); 
+    return data; 
+  end function;
+
+end package body;
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from slvcodec import entity
+
+vhdl_dir = os.path.join(os.path.dirname(__file__),  'vhdl')
+
+
+@pytest.fixture
+def dummy_entity():
+    '''
+    The resolved dummy entity from tests/vhdl/dummy.vhd.
+    '''
+    entity_filename = os.path.join(vhdl_dir, 'dummy.vhd')
+    package_filename = os.path.join(vhdl_dir, 'vhdl_type_pkg.vhd')
+    entities, packages = entity.process_files([entity_filename, package_filename])
+    return entities['dummy']
+
+
+class StreamingTest:
+    '''
+    Generates the inputs with a generator and checks the outputs as a stream.
+    '''
+
+    def __init__(self, n_lines):
+        self.n_lines = n_lines
+        self.n_checked = 0
+
+    def make_input_data(self):
+        for index in range(self.n_lines):
+            yield {'i_datas': [index % 64, 0, 0]}
+
+    def check_output_stream(self, pairs):
+        for index, (i_d, o_d) in enumerate(pairs):
+            assert i_d['i_datas'][0] == index % 64
+            assert o_d['o_firstdata'] == i_d['i_datas'][0]
+            self.n_checked += 1
+
+
+def fake_simulation(resolved_entity, generics, output_path):
+    '''
+    Write the outdata.dat that the dummy entity would produce.
+    '''
+    with open(os.path.join(output_path, 'indata.dat')) as f:
+        lines = f.readlines()
+    width = resolved_entity.codec(generics).layouts['out'][0].width
+    with open(os.path.join(output_path, 'outdata.dat'), 'w') as f:
+        for line in lines:
+            i_data = resolved_entity.inputs_from_slv(line, generics)
+            first = i_data['i_datas'][0]
+            f.write(str(first % 2) + format(first, '06b') + '0' * width + '\n')
@@ -0,0 +1,265 @@
+'''
+Benchmarks of the slvcodec hot paths.
+
+Run with
+    python run_benchmarks.py --output results.json
+to time each benchmark and save the results, so that the results from
+different releases can be compared.
+'''
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+
+from slvcodec import entity, package, package_generator, symbolic_math, typs, vhdl_parser
+
+import synthetic_design
+
+vhdl_dir = os.path.join(os.path.dirname(__file__), 'vhdl')
+
+# The generics used for the synthetic top level entity.
+TOP_GENERICS = {'width': 16, 'length': 4}
+
+# The default numbers of records per package in the scaling benchmarks.
+DEFAULT_SIZES = (50, 200)
+
+
+def make_value(typ, generics):
+    '''
+    Make a value of type `typ` that can be converted to std_logic_vector.
+    '''
+    if isinstance(typ, typs.StdLogic):
+        value = 1
+    elif isinstance(typ, typs.Enumeration):
+        value = typ.literals[-1]
+    elif isinstance(typ, typs.ConstrainedSigned):
+        value = -1
+    elif isinstance(typ, typs.ConstrainedStdLogicVector):
+        value = 1
+    elif isinstance(typ, typs.ConstrainedArray):
+        size = typs.apply_generics(generics, typ.size)
+        value = [make_value(typ.unconstrained_type.subtype, generics)] * size
+    elif isinstance(typ, typs.Record):
+        value = dict([(name, make_value(subtype, generics))
+                      for name, subtype in typ.names_and_subtypes])
+    else:
+        raise Exception('Cannot make a value of type {}'.format(typ))
+    return value
+
+
+def conversion_benchmarks(typ, generics):
+    '''
+    Make benchmarks of converting a value of `typ` to and from
+    std_logic_vector.
+    '''
+    value = make_value(typ, generics)
+    slv = typ.to_slv(value, generics)
+    return {
+        'to_slv': lambda: typ.to_slv(value, generics),
+        'from_slv': lambda: typ.from_slv(slv, generics),
+        }
+
+
+def clear_caches():
+    '''
+    Clear the memoized results in symbolic_math and the cached parse
+    results so that a benchmark does all the work every time.
+    '''
+    symbolic_math.clear_caches()
+    package.vparser = vhdl_parser.VHDLParser(None)
+
+
+def scaling_benchmarks(directory, n_records):
+    '''
+    Make benchmarks of processing a synthetic design with `n_records`
+    records in each package.
+    '''
+    design_directory = os.path.join(directory, 'design_{}'.format(n_records))
+    os.makedirs(design_directory)
+    filenames = synthetic_design.write_design(design_directory, n_records=n_records)
+    parsed_packages = [vhdl_parser.VHDLDesignFile.parse(vhdl_parser.read_code(fn))
+                       for fn in filenames[:-1]]
+    entities, resolved_packages = entity.process_files(filenames)
+    synthetic_packages = [resolved_packages[p.packages[0].identifier]
+                          for p in parsed_packages]
+
+    def process_files():
+        clear_caches()
+        entity.process_files(filenames)
+
+    def resolve_packages():
+        clear_caches()
+        package.resolve_packages([package.process_parsed_package(p)
+                                  for p in parsed_packages])
+
+    def make_slvcodec_packages():
+        clear_caches()
+        for p in synthetic_packages:
+            package_generator.make_slvcodec_package(p)
+    return {
+        'scaling.process_files.{}'.format(n_records): process_files,
+        'scaling.resolve_packages.{}'.format(n_records): resolve_packages,
+        'scaling.make_slvcodec_package.{}'.format(n_records): make_slvcodec_packages,
+        }
+
+
+def make_benchmarks(directory, sizes=DEFAULT_SIZES):
+    '''
+    Create all the benchmarks.  `sizes` are the numbers of records per
+    package in the synthetic designs used by the scaling benchmarks.
+    Returns a dictionary mapping benchmark names to functions.
+    '''
+    benchmarks = {}
+    # Conversions of each type class.
+    packages = package.parse_process_and_resolve_packages(
+        [os.path.join(vhdl_dir, 'vhdl_type_pkg.vhd')])
+    types = packages['vhdl_type_pkg'].types
+    typ_examples = {
+        'StdLogic': typs.std_logic,
+        'ConstrainedStdLogicVector': types['t_data'],
+        'ConstrainedUnsigned': types['t_anunsigned'],
+        'ConstrainedSigned': types['t_asigned'],
+        'ConstrainedArray': types['array_of_array_of_unsigned'],
+        'Record': types['t_dummy'],
+        'Enumeration': typs.Enumeration('t_state', ['s_idle', 's_busy', 's_done']),
+        }
+    for class_name, typ in typ_examples.items():
+        for name, f in conversion_benchmarks(typ, generics={}).items():
+            benchmarks['typs.{}.{}'.format(class_name, name)] = f
+    # Conversions of the interface of a large synthetic entity.
+    filenames = synthetic_design.write_design(directory)
+    entities, resolved_packages = entity.process_files(filenames)
+    top = entities['synthetic_top']
+    codec = top.codec(TOP_GENERICS)
+    inputs = dict([(layout.name, make_value(layout.typ, TOP_GENERICS))
+                   for layout in codec.layouts['in']])
+    outputs = dict([(layout.name, make_value(layout.typ, TOP_GENERICS))
+                    for layout in codec.layouts['out']])
+    output_slv = ''.join(reversed([
+        layout.typ.to_slv(outputs[layout.name], TOP_GENERICS)
+        for layout in codec.layouts['out']]))
+    assert top.outputs_from_slv(output_slv, TOP_GENERICS) == outputs
+    benchmarks['Entity.inputs_to_slv'] = lambda: top.inputs_to_slv(inputs, TOP_GENERICS)
+    benchmarks['Entity.outputs_from_slv'] = lambda: top.outputs_from_slv(
+        output_slv, TOP_GENERICS)
+    # A check that only looks at a few of the output ports.
+    checked_names = [layout.name for layout in codec.layouts['out'][:3]]
+
+    def lazy_outputs_from_slv():
+        outputs = top.outputs_from_slv(output_slv, TOP_GENERICS, lazy=True)
+        return [outputs[name] for name in checked_names]
+    benchmarks['Entity.outputs_from_slv.lazy'] = lazy_outputs_from_slv
+    # Parsing and simplifying expressions.
+    expressions = ['fish + 8*bear + 2 * (fish - bear)',
+                   '(logceil(5*4)-1)+1-0',
+                   '3 * 2 / fish / (3 / 4)']
+
+    def parse_expressions():
+        clear_caches()
+        for expression in expressions:
+            symbolic_math.parse_and_simplify(expression)
+    benchmarks['symbolic_math.parse_and_simplify'] = parse_expressions
+    # Parsing a large package.
+    package_code = vhdl_parser.read_code(filenames[0])
+    benchmarks['VHDLDesignFile.parse'] = lambda: vhdl_parser.VHDLDesignFile.parse(
+        package_code)
+    # Generating the slvcodec package for a large package.
+    synthetic_package = resolved_packages['synthetic0_pkg']
+
+    def make_slvcodec_package():
+        clear_caches()
+        package_generator.make_slvcodec_package(synthetic_package)
+    benchmarks['make_slvcodec_package'] = make_slvcodec_package
+    # How processing scales with the size of the design.
+    for n_records in sizes:
+        benchmarks.update(scaling_benchmarks(directory, n_records))
+    return benchmarks
+
+
+def calibrate(timer, min_time=0.2):
+    '''
+    The number of calls, 1, 2, 5, 10, 20, 50, ..., for which `timer` takes
+    at least `min_time` seconds.  This is Timer.autorange, which needs
+    Python 3.6.
+    '''
+    base = 1
+    while True:
+        for multiple in (1, 2, 5):
+            number = base * multiple
+            if timer.timeit(number) >= min_time:
+                return number
+        base *= 10
+
+
+def time_function(f, repeat):
+    '''
+    Time a function.  It is called enough times that each repeat takes at
+    least 0.2 seconds.
+    Returns a dictionary of the number of calls per repeat and the best and
+    median time per call in seconds.
+    '''
+    timer = timeit.Timer(f)
+    number = calibrate(timer)
+    times = [t/number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'number': number,
+        'best': min(times),
+        'median': statistics.median(times),
+        }
+
+
+def get_version():
+    try:
+        from slvcodec import version
+        v = version.version
+    except ImportError:
+        v = 'unknown'
+    return v
+
+
+def run_benchmarks(names_filter=None, repeat=5, sizes=DEFAULT_SIZES):
+    '''
+    Run the benchmarks whose names contain `names_filter`.
+    Returns a dictionary of the results.
+    '''
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        benchmarks = make_benchmarks(directory, sizes=sizes)
+        for name, f in benchmarks.items():
+            if (names_filter is None) or (names_filter in name):
+                results[name] = time_function(f, repeat=repeat)
+                print('{:40} {:12.3f} us'.format(name, results[name]['best']*1e6))
+    return {
+        'slvcodec_version': get_version(),
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'date': datetime.datetime.now().isoformat(),
+        'results': results,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the slvcodec benchmarks.')
+    parser.add_argument('--output', help='A JSON file to write the results to.')
+    parser.add_argument('--filter', help='Only run benchmarks with this in their name.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='The number of times each benchmark is timed.')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Comma separated numbers of records per package for '
+                        'the scaling benchmarks.')
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    results = run_benchmarks(names_filter=args.filter, repeat=args.repeat, sizes=sizes)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,192 @@
+'''
+Generates large synthetic VHDL designs for measuring how slvcodec scales.
+
+The designs are made from a chain of packages followed by a top level
+entity.  Each package defines constants, std_logic_vector subtypes, an
+enumeration and many records.  Records contain fields of the types defined
+before them (including records and arrays of records from earlier
+packages) so that they are nested, and arrays and arrays of arrays of the
+records are defined too.  The entity has generics that set the widths and
+sizes of some of its ports.
+
+The same seed and size parameters always give the same design.
+'''
+
+import os
+import random
+
+# The generics of the top level entity and their default values.
+TOP_GENERICS = (('WIDTH', 8), ('LENGTH', 3))
+
+
+class SyntheticPackage:
+    '''
+    Builds the VHDL for one synthetic package.
+    `available` is a list of (type_expression, depth) tuples of the types
+    that can be used for record fields.  New types are appended to it.
+    '''
+
+    def __init__(self, name, rng, available, n_records, n_fields, max_depth):
+        self.name = name
+        self.rng = rng
+        self.available = available
+        self.n_records = n_records
+        self.n_fields = n_fields
+        self.max_depth = max_depth
+        self.lines = []
+
+    def add_scalar_types(self):
+        name = self.name
+        self.lines += [
+            '  constant {}_WIDTH: natural := {};'.format(name, self.rng.randint(2, 16)),
+            '  constant {}_DOUBLE: natural := 2*{}_WIDTH + 1;'.format(name, name),
+            '  subtype {}_word is std_logic_vector({}_WIDTH-1 downto 0);'.format(name, name),
+            '  subtype {}_doubleword is unsigned({}_DOUBLE-1 downto 0);'.format(name, name),
+            '  subtype {}_offset is signed(4 downto 0);'.format(name),
+            '  type {}_state is ({});'.format(name, ', '.join(
+                '{}_s{}'.format(name, index) for index in range(self.rng.randint(2, 9)))),
+            ]
+        self.available += [
+            ('std_logic', 0),
+            ('{}_word'.format(name), 0),
+            ('{}_doubleword'.format(name), 0),
+            ('{}_offset'.format(name), 0),
+            ('{}_state'.format(name), 0),
+            ('std_logic_vector({} downto 0)'.format(self.rng.randint(0, 31)), 0),
+            ]
+
+    def add_record(self, index):
+        record_name = '{}_rec{}'.format(self.name, index)
+        candidates = [(typ, depth) for typ, depth in self.available
+                      if depth < self.max_depth]
+        fields = [self.rng.choice(candidates) for field_index in range(self.n_fields)]
+        depth = 1 + max(field_depth for typ, field_depth in fields)
+        self.lines.append('  type {} is record'.format(record_name))
+        for field_index, (typ, field_depth) in enumerate(fields):
+            self.lines.append('    field{}: {};'.format(field_index, typ))
+        self.lines.append('  end record;')
+        # Arrays of the record, and for some records arrays of arrays.
+        array_name = '{}_array'.format(record_name)
+        self.lines.append('  type {} is array(integer range <>) of {};'.format(
+            array_name, record_name))
+        self.available += [
+            (record_name, depth),
+            ('{}({} downto 0)'.format(array_name, self.rng.randint(0, 2)), depth),
+            ]
+        if index % 3 == 0:
+            grid_name = '{}_grid'.format(record_name)
+            self.lines.append('  type {} is array({} downto 0) of {}({} downto 0);'.format(
+                grid_name, self.rng.randint(0, 1), array_name, self.rng.randint(0, 1)))
+            self.available.append((grid_name, depth))
+
+    def make_code(self, used_packages):
+        self.add_scalar_types()
+        for index in range(self.n_records):
+            self.add_record(index)
+        header = [
+            'library ieee;',
+            'use ieee.std_logic_1164.all;',
+            'use ieee.numeric_std.all;',
+            '',
+            ] + ['use work.{}.all;'.format(p) for p in used_packages] + [
+            '',
+            'package {} is'.format(self.name),
+            ]
+        return '\n'.join(header + self.lines + ['end package;', ''])
+
+
+def make_top_entity(name, rng, available, used_packages, n_ports):
+    '''
+    Make the VHDL for an entity with `n_ports` ports (plus a clock and a
+    reset).  Some of the port widths and sizes depend on the generics.
+    '''
+    generics = ['    {}: natural := {}'.format(g, default) for g, default in TOP_GENERICS]
+    ports = ['    clk: in std_logic', '    reset: in std_logic']
+    # Keep the ports to a reasonable width by only using types that are
+    # not too deeply nested.
+    shallow = [typ for typ, depth in available if depth < 2]
+    arrays = [typ.split('(')[0] for typ, depth in available
+              if ('_array(' in typ) and (depth < 2)]
+    for index in range(n_ports):
+        direction = ('in', 'out')[index % 2]
+        choice = index % 5
+        if choice == 0:
+            typ = 'std_logic_vector(WIDTH-1 downto 0)'
+        elif choice == 1:
+            typ = 'unsigned(2*WIDTH-1 downto 0)'
+        elif (choice == 2) and arrays:
+            typ = '{}(LENGTH-1 downto 0)'.format(rng.choice(arrays))
+        else:
+            typ = rng.choice(shallow)
+        ports.append('    port{}: {} {}'.format(index, direction, typ))
+    lines = [
+        'library ieee;',
+        'use ieee.std_logic_1164.all;',
+        'use ieee.numeric_std.all;',
+        '',
+        ] + ['use work.{}.all;'.format(p) for p in used_packages] + [
+        '',
+        'entity {} is'.format(name),
+        '  generic (',
+        ';\n'.join(generics),
+        '    );',
+        '  port (',
+        ';\n'.join(ports),
+        '    );',
+        'end entity;',
+        '',
+        'architecture arch of {} is'.format(name),
+        'begin',
+        'end architecture;',
+        '',
+        ]
+    return '\n'.join(lines)
+
+
+def make_design(seed=0, n_packages=2, n_records=100, n_fields=6, max_depth=3,
+                n_ports=100, entity_name='synthetic_top'):
+    '''
+    Make a synthetic design.
+
+    Args:
+      `seed`: The seed for the random choices.
+      `n_packages`: The number of packages.  Each package uses all the
+         packages before it.
+      `n_records`: The number of records in each package.
+      `n_fields`: The number of fields in each record.
+      `max_depth`: The maximum depth to which records are nested.
+      `n_ports`: The number of ports on the top level entity.
+      `entity_name`: The name of the top level entity.
+
+    Returns:
+      A list of (filename, code) tuples in compilation order.  The last is
+      the top level entity.
+    '''
+    rng = random.Random(seed)
+    available = []
+    package_names = []
+    files = []
+    for index in range(n_packages):
+        name = 'synthetic{}_pkg'.format(index)
+        package = SyntheticPackage(
+            name=name, rng=rng, available=available, n_records=n_records,
+            n_fields=n_fields, max_depth=max_depth)
+        files.append(('{}.vhd'.format(name), package.make_code(package_names)))
+        package_names.append(name)
+    files.append(('{}.vhd'.format(entity_name), make_top_entity(
+        entity_name, rng, available, package_names, n_ports)))
+    return files
+
+
+def write_design(directory, **kwargs):
+    '''
+    Write a synthetic design (see `make_design`) to files in `directory`.
+    Returns the filenames in compilation order.
+    '''
+    filenames = []
+    for filename, code in make_design(**kwargs):
+        full_filename = os.path.join(directory, filename)
+        with open(full_filename, 'w') as f:
+            f.write(code)
+        filenames.append(full_filename)
+    return filenames
@@ -0,0 +1,84 @@
+import pytest
+
+numpy = pytest.importorskip('numpy')
+columnar = pytest.importorskip('slvcodec.columnar')
+
+
+def test_columns_from_lines(dummy_entity):
+    generics = {'length': 2}
+    inputs = [{
+        'reset': i % 2,
+        'i_valid': 1,
+        'i_dummy': {
+            'manydata': [i, 2*i],
+            'data': 3,
+            'logic': 0,
+            'slv': 15,
+            },
+        'i_datas': [1, 2, i],
+        } for i in range(10)]
+    lines = [dummy_entity.inputs_to_slv(d, generics=generics) for d in inputs]
+    # Set one of the lines to metavalues.
+    lines[3] = 'U' * len(lines[3])
+    values, mask = dummy_entity.columns_from_lines(
+        lines, generics=generics, direction='in')
+    assert len(values) == 10
+    assert list(values['reset']) == [i % 2 if i != 3 else 0 for i in range(10)]
+    assert list(values['i_dummy']['manydata'][:, 1]) == [2*i if i != 3 else 0 for i in range(10)]
+    assert list(values['i_datas'][9]) == [1, 2, 9]
+    assert list(mask['reset']) == [i == 3 for i in range(10)]
+    assert mask['i_dummy']['slv'][3]
+    assert numpy.all(mask['i_datas'][3])
+    # The columns agree with the line by line decoding.
+    for line, value in zip(lines[4:], values[4:]):
+        decoded = dummy_entity.inputs_from_slv(line, generics=generics)
+        assert decoded['i_dummy']['slv'] == value['i_dummy']['slv']
+        assert decoded['i_datas'] == list(value['i_datas'])
+
+
+def test_columns_to_lines(dummy_entity):
+    generics = {'length': 2}
+    n = 5
+    values = {
+        'reset': numpy.arange(n) % 2,
+        'i_dummy': {
+            'manydata': numpy.array([[i, 2*i] for i in range(n)]),
+            'data': numpy.full(n, 3),
+            'logic': numpy.zeros(n, dtype=int),
+            'slv': numpy.full(n, 15),
+            },
+        'i_datas': numpy.array([[1, 2, i] for i in range(n)]),
+        }
+    lines = dummy_entity.columns_to_lines(values, generics=generics)
+    assert len(lines) == n
+    for i, line in enumerate(lines):
+        expected = dummy_entity.inputs_to_slv({
+            'reset': i % 2,
+            'i_dummy': {'manydata': [i, 2*i], 'data': 3, 'logic': 0, 'slv': 15},
+            'i_datas': [1, 2, i],
+            }, generics=generics)
+        assert line == expected
+    # Missing ports are set to 'U'.
+    decoded, mask = dummy_entity.columns_from_lines(
+        lines, generics=generics, direction='in')
+    assert numpy.all(mask['i_valid'])
+    assert list(decoded['i_datas'][:, 2]) == list(range(n))
+    del values['reset']
+    lines = dummy_entity.columns_to_lines(values, generics=generics)
+    assert all(dummy_entity.inputs_from_slv(line, generics)['reset'] is None
+               for line in lines)
+    # No rows give no lines.
+    empty = {'i_datas': numpy.zeros((0, 3), dtype=int)}
+    assert dummy_entity.columns_to_lines(empty, generics=generics) == []
+
+
+@pytest.mark.parametrize('width', [1, 62, 63])
+def test_signed_integer_column(width):
+    column = columnar.IntegerColumn(width=width, is_signed=True)
+    min_value = -pow(2, width-1)
+    max_value = pow(2, width-1)-1
+    values = numpy.array([min_value, -1, 0, max_value], dtype=numpy.int64)
+    decoded, mask = column.decode(column.encode(values))
+    assert decoded.dtype == numpy.int64
+    assert list(decoded) == [min_value, -1, 0, max_value]
+    assert not numpy.any(mask)
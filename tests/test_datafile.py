@@ -0,0 +1,72 @@
+import os
+
+from slvcodec import datafile, test_utils
+
+from conftest import StreamingTest, fake_simulation
+
+
+def test_datafile(tmpdir):
+    filename = os.path.join(str(tmpdir), 'lines.dat')
+    lines = [format(i, '08b') for i in range(100)]
+    for trailing in ('', '\n'):
+        with open(filename, 'w') as f:
+            f.write('\n'.join(lines) + trailing)
+        # Fixed width lines.
+        with datafile.DataFile(filename, width=8) as lines_file:
+            assert lines_file.width == 8
+            assert len(lines_file) == 100
+            assert lines_file[37] == lines[37]
+            assert lines_file[-1] == lines[-1]
+            window = lines_file[10:50:3]
+            assert list(window) == lines[10:50:3]
+            assert list(window[-2:]) == lines[10:50:3][-2:]
+        # A width that does not match falls back to indexing the lines.
+        with datafile.DataFile(filename, width=7) as lines_file:
+            assert lines_file.width is None
+            assert list(lines_file) == lines
+    # Lines of different widths that happen to have the same total size
+    # as fixed width lines are indexed.
+    uneven = lines[:20] + [lines[20][:4], lines[21] + lines[21][:4]] + lines[22:]
+    with open(filename, 'w') as f:
+        f.write('\n'.join(uneven))
+    with datafile.DataFile(filename, width=8) as lines_file:
+        assert lines_file.width is None
+        assert list(lines_file) == uneven
+    data = b'0101\n1\n010\n0101'
+    assert datafile.count_newlines(data, len(data), chunk_size=3) == 3
+    assert datafile.count_fixed_width_lines(data, len(data), 4) is None
+    with open(filename, 'w') as f:
+        f.write('1\n22\n\n4444')
+    with datafile.DataFile(filename, decode=len) as lines_file:
+        assert list(lines_file) == [1, 2, 0, 4]
+
+
+def test_post_check_datafiles(tmpdir, dummy_entity):
+    generics = {'length': 3}
+    output_path = str(tmpdir)
+
+    class DataFileTest:
+        def __init__(self, n_lines):
+            self.n_lines = n_lines
+            self.n_checked = 0
+
+        def make_input_data(self):
+            return StreamingTest.make_input_data(self)
+
+        def check_output_datafiles(self, input_data, output_data):
+            assert isinstance(output_data, datafile.DataFile)
+            assert output_data.width is not None
+            assert len(input_data) == len(output_data) == self.n_lines
+            # Check a window of the data without decoding the rest.
+            for i_d, o_d in zip(input_data[5:15], output_data[5:15]):
+                assert o_d['o_firstdata'] == i_d['i_datas'][0]
+                self.n_checked += 1
+
+    test = DataFileTest(n_lines=20)
+    assert test_utils.make_pre_config(test, dummy_entity, generics)(output_path)
+    fake_simulation(dummy_entity, generics, output_path)
+    with open(os.path.join(output_path, 'outdata.dat'), 'a') as f:
+        # Extra outputs after the end of the inputs are ignored.
+        f.write('1' * dummy_entity.codec(generics).widths['out'] + '\n')
+    assert test_utils.make_post_check(test, dummy_entity, generics)(output_path)
+    assert test.n_checked == 10
@@ -1,7 +1,9 @@
 import logging
 import os
 
-from slvcodec import entity, package, typs, config, symbolic_math
+import pytest
+
+from slvcodec import entity, package, typs, config, symbolic_math, conversions
 
 vhdl_dir = os.path.join(os.path.dirname(__file__),  'vhdl')
 
@@ -28,6 +30,68 @@ def test_dummy_width():
     assert(w.value() == length * 6)
 
 
+
+def test_parallel_process_files(monkeypatch):
+    # A parser without cached results so that the files are parsed.
+    monkeypatch.setattr(package, 'vparser', package.vhdl_parser.VHDLParser(None))
+    filenames = [os.path.join(vhdl_dir, fn) for fn in
+                 ('dummy.vhd', 'vhdl_type_pkg.vhd')]
+    entities, packages = entity.process_files(filenames, n_workers=2)
+    sequential_entities, sequential_packages = entity.process_files(filenames)
+    assert list(entities.keys()) == list(sequential_entities.keys())
+    assert list(packages.keys()) == list(sequential_packages.keys())
+    assert entities['dummy'].ports.keys() == sequential_entities['dummy'].ports.keys()
+
+
+def test_dummy_codec(dummy_entity):
+    generics = {'length': 3}
+    inputs = {
+        'reset': 1,
+        'i_valid': 0,
+        'i_dummy': {
+            'manydata': [3, 7],
+            'data': 12,
+            'logic': 1,
+            'slv': 5,
+            },
+        'i_datas': [1, 2, 63],
+        }
+    slv = dummy_entity.inputs_to_slv(inputs, generics=generics)
+    assert len(slv) == 1 + 1 + 23 + 3 * 6
+    assert dummy_entity.inputs_from_slv(slv, generics=generics) == inputs
+    # Missing inputs are set to 'U' and decoded as None.
+    slv = dummy_entity.inputs_to_slv({'reset': 0}, generics=generics)
+    decoded = dummy_entity.inputs_from_slv(slv, generics=generics)
+    assert decoded['reset'] == 0
+    assert decoded['i_valid'] is None
+    # The same codec is reused for the same generics.
+    codec = dummy_entity.codec(generics)
+    assert dummy_entity.codec({'length': 3}) is codec
+    assert dummy_entity.codec({'length': 4}) is not codec
+    outputs = {'o_data': [1, 2, 3, 4], 'o_firstdata': 5, 'o_firstdatabit': 1}
+    o_slv = ''.join([
+        '1', '000101', '000100', '000011', '000010', '000001'])
+    assert dummy_entity.outputs_from_slv(o_slv, generics={'length': 4}) == outputs
+
+
+
+def test_wrong_width_lines(dummy_entity):
+    generics = {'length': 3}
+    slv = dummy_entity.inputs_to_slv({'reset': 1, 'i_datas': [1, 2, 3]}, generics)
+    assert len(slv) == 43
+    decode = dummy_entity.codec(generics).line_decoder('in')
+    for bad_slv in (slv[1:], slv[13:], slv[33:], slv + '0'):
+        with pytest.raises(ValueError) as excinfo:
+            dummy_entity.inputs_from_slv(bad_slv, generics)
+        assert 'width 43 but got width {}'.format(len(bad_slv)) in str(excinfo.value)
+        with pytest.raises(ValueError):
+            dummy_entity.inputs_from_slv(bad_slv, generics, lazy=True)
+        with pytest.raises(ValueError):
+            decode(bad_slv)
+    with pytest.raises(ValueError):
+        dummy_entity.inputs_from_hex(conversions.slv_to_hex(slv[5:]), generics)
+
 if __name__ == '__main__':
     config.setup_logging(logging.DEBUG)
     test_dummy_width()
+    test_dummy_codec()
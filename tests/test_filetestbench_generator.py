@@ -0,0 +1,52 @@
+import os
+import shutil
+
+from slvcodec import filetestbench_generator, package, package_generator
+
+vhdl_dir = os.path.join(os.path.dirname(__file__),  'vhdl')
+
+
+def test_incremental_slvcodec_files(tmpdir, monkeypatch):
+    directory = str(tmpdir)
+    package_filename = os.path.join(directory, 'vhdl_type_pkg.vhd')
+    shutil.copy(os.path.join(vhdl_dir, 'vhdl_type_pkg.vhd'), package_filename)
+    filenames = filetestbench_generator.add_slvcodec_files(directory, [package_filename])
+    generated_filename = os.path.join(directory, 'vhdl_type_pkg_slvcodec.vhd')
+    assert generated_filename in filenames
+    os.utime(generated_filename, (0, 0))
+    # Nothing has changed so nothing is parsed or written.
+    with monkeypatch.context() as m:
+        m.setattr(package, 'parsed_from_filenames', None)
+        assert filetestbench_generator.add_slvcodec_files(
+            directory, [package_filename]) == filenames
+    assert os.path.getmtime(generated_filename) == 0
+    # A change that does not affect the generated package.
+    with open(package_filename, 'a') as f:
+        f.write('\n-- A comment\n')
+    assert filetestbench_generator.add_slvcodec_files(
+        directory, [package_filename]) == filenames
+    assert os.path.getmtime(generated_filename) == 0
+    # A change that does.
+    with open(package_filename, 'r') as f:
+        contents = f.read()
+    with open(package_filename, 'w') as f:
+        f.write(contents.replace('t_dummy', 't_dummier'))
+    filetestbench_generator.add_slvcodec_files(directory, [package_filename])
+    assert os.path.getmtime(generated_filename) != 0
+
+
+def test_template_environment(tmpdir, monkeypatch):
+    # The environment is only created when it is needed.
+    monkeypatch.setattr(package_generator, '_template_environment', None)
+    environment = package_generator.get_template_environment()
+    assert environment.bytecode_cache is None
+    template = environment.get_template('slvcodec_record_template.vhd')
+    # Templates are compiled once and then reused.
+    assert environment.get_template('slvcodec_record_template.vhd') is template
+    assert package_generator.get_template_environment() is environment
+    # The compiled templates can also be cached on disk.
+    cache_directory = os.path.join(str(tmpdir), 'template_cache')
+    package_generator.use_template_cache(cache_directory)
+    environment.cache.clear()
+    environment.get_template('slvcodec_record_template.vhd')
+    assert os.listdir(cache_directory)
@@ -1,7 +1,9 @@
 import logging
 import os
 
-from slvcodec import package, config
+import pytest
+
+from slvcodec import package, config, vhdl_parser, filetestbench_generator
 
 vhdl_dir = os.path.join(os.path.dirname(__file__),  'vhdl')
 
@@ -16,6 +18,57 @@ def test_dummy_width():
     assert(aau.width.value() == 6*6*4)
 
 
+def test_parse_cache(tmpdir, monkeypatch):
+    filename = os.path.join(vhdl_dir, 'vhdl_type_pkg.vhd')
+    cache_directory = str(tmpdir.join('parse_cache'))
+    # use_parse_cache replaces the global parser, which is restored when
+    # the test finishes.
+    monkeypatch.setattr(package, 'vparser', package.vparser)
+    package.use_parse_cache(cache_directory)
+    parsed = package.parsed_from_filename(filename)
+    assert parsed.packages[0].identifier == 'vhdl_type_pkg'
+
+    def fail_parse(code):
+        raise Exception('Should have used the cached result.')
+    monkeypatch.setattr(vhdl_parser.VHDLDesignFile, 'parse', fail_parse)
+    # A new parser using the same directory reuses the result.
+    package.use_parse_cache(cache_directory)
+    cached = package.parsed_from_filename(filename)
+    assert cached.packages[0].identifier == 'vhdl_type_pkg'
+    # A change to the slvcodec source invalidates the cached results.
+    monkeypatch.setattr(filetestbench_generator, 'slvcodec_hash', lambda: 'changed')
+    package.use_parse_cache(cache_directory)
+    with pytest.raises(Exception) as excinfo:
+        package.parsed_from_filename(filename)
+    assert 'Should have used the cached result.' in str(excinfo.value)
+
+
+def test_resolve_dependencies():
+    dependencies = {'c': ['b', 'a'], 'b': ['a', 'x'], 'a': ['x'], 'd': ['e'], 'e': ['d'], 'f': ['d']}
+    unresolved = dict([(name, name) for name in dependencies])
+    resolved, failed = package.resolve_dependencies(
+        available={'x': 'x'}, unresolved=unresolved, dependencies=dependencies,
+        resolve_function=lambda name, item, available: (
+            name + ''.join(available[d] for d in dependencies[name])))
+    assert resolved['c'] == 'cbaxxax'
+    assert set(failed.keys()) == {'d', 'e', 'f'}
+    order, blocked = package.topological_order(dependencies)
+    assert order == ['a', 'b', 'c']
+    assert package.find_cycle(blocked, dependencies) == ['d', 'e', 'd']
+
+
+def test_circular_packages():
+    packages = [
+        package.UnresolvedPackage(identifier=name, types={}, constants={}, uses={
+            use_name: package.Use(library='work', design_unit=use_name, name_within='all')
+            for use_name in uses})
+        for name, uses in (('pkg_a', ['pkg_b']), ('pkg_b', ['pkg_c', 'numeric_std']),
+                           ('pkg_c', ['pkg_a']))]
+    with pytest.raises(Exception) as excinfo:
+        package.resolve_packages(packages)
+    assert 'pkg_a -> pkg_b -> pkg_c -> pkg_a' in str(excinfo.value)
+
+
 if __name__ == '__main__':
     config.setup_logging(logging.DEBUG)
     test_dummy_width()
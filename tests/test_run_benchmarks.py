@@ -0,0 +1,21 @@
+from slvcodec import package
+
+import run_benchmarks
+
+
+def test_benchmarks(tmpdir, monkeypatch):
+    # The benchmarks replace the global parser, which is restored when the
+    # test finishes.
+    monkeypatch.setattr(package, 'vparser', package.vparser)
+    # Check that every benchmark runs.
+    benchmarks = run_benchmarks.make_benchmarks(str(tmpdir), sizes=[5])
+    assert 'typs.Record.from_slv' in benchmarks
+    assert 'scaling.process_files.5' in benchmarks
+    for f in benchmarks.values():
+        f()
+
+
+def test_time_function():
+    result = run_benchmarks.time_function(lambda: None, repeat=2)
+    assert result['number'] >= 1
+    assert 0 <= result['best'] <= result['median']
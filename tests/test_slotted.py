@@ -0,0 +1,101 @@
+import os
+import pickle
+import sys
+
+from slvcodec import entity, package, slotted, typs
+
+vhdl_dir = os.path.join(os.path.dirname(__file__),  'vhdl')
+
+
+def unslotted(cls):
+    '''
+    Make a copy of a class that stores its attributes in a __dict__, as the
+    classes did before they had slots.
+    '''
+    namespace = dict((name, value) for name, value in cls.__dict__.items()
+                     if name not in cls.__slots__ + ('__slots__',))
+    namespace['__qualname__'] = 'Unslotted' + cls.__name__
+    namespace['__module__'] = __name__
+    return type('Unslotted' + cls.__name__, (), namespace)
+
+
+UnslottedPort = unslotted(entity.Port)
+UnslottedUse = unslotted(package.Use)
+UnslottedEnumeration = unslotted(typs.Enumeration)
+
+
+def make_objects(port_class, use_class, enumeration_class):
+    objects = []
+    for index in range(50):
+        objects.append(port_class(name='port{}'.format(index), direction='in', typ=typs.std_logic))
+        objects.append(use_class(library='work', design_unit='pkg{}'.format(index),
+                                 name_within='all'))
+        objects.append(enumeration_class('t_state{}'.format(index), ['s_idle', 's_busy']))
+    return objects
+
+
+def slotted_objects(item, found):
+    '''
+    Find the Slotted objects reachable from `item`.
+    '''
+    if isinstance(item, (list, tuple)):
+        for value in item:
+            slotted_objects(value, found)
+    elif isinstance(item, dict):
+        for value in item.values():
+            slotted_objects(value, found)
+    elif isinstance(item, slotted.Slotted) and (id(item) not in found):
+        found[id(item)] = item
+        for name in slotted.all_slots(type(item)):
+            slotted_objects(getattr(item, name, None), found)
+    return found
+
+
+def test_slotted_sizes():
+    slotted_list = make_objects(entity.Port, package.Use, typs.Enumeration)
+    unslotted_list = make_objects(UnslottedPort, UnslottedUse, UnslottedEnumeration)
+    # Instances without a __dict__ use less memory.
+    for s, u in zip(slotted_list, unslotted_list):
+        assert not hasattr(s, '__dict__')
+        assert sys.getsizeof(s) < sys.getsizeof(u) + sys.getsizeof(u.__dict__)
+    # And are smaller when pickled.
+    compact = pickle.dumps(slotted_list)
+    assert len(compact) < len(pickle.dumps(unslotted_list))
+    copies = pickle.loads(compact)
+    assert [o.name for o in copies[::3]] == [o.name for o in slotted_list[::3]]
+    assert copies[2].to_slv('s_busy', {}) == '1'
+
+
+def test_slotted_round_trip():
+    entity_filename = os.path.join(vhdl_dir, 'dummy.vhd')
+    package_filename = os.path.join(vhdl_dir, 'vhdl_type_pkg.vhd')
+    parsed = package.parsed_from_filenames([entity_filename, package_filename])
+    entities, packages = entity.process_files([entity_filename, package_filename])
+    dummy = entities['dummy']
+    objects = slotted_objects(
+        [parsed, list(dummy.ports.values()), list(dummy.uses.values()),
+         packages['vhdl_type_pkg'].types], {})
+    classes = set(type(o) for o in objects.values())
+    assert typs.Record in classes
+    assert entity.Port in classes
+    assert package.Use in classes
+    assert package.vhdl_parser.VHDLDesignFile in classes
+    for o in objects.values():
+        assert not hasattr(o, '__dict__')
+    # The pickles unpickle correctly, including slots that were never set.
+    parsed_copy, dummy_copy = pickle.loads(pickle.dumps((parsed, dummy)))
+    assert parsed_copy[0].references == parsed[0].references
+    generics = {'length': 3}
+    inputs = {
+        'reset': 1,
+        'i_valid': 0,
+        'i_dummy': {'manydata': [3, 7], 'data': 12, 'logic': 1, 'slv': 5},
+        'i_datas': [1, 2, 63],
+        }
+    slv = dummy.inputs_to_slv(inputs, generics)
+    assert dummy_copy.inputs_to_slv(inputs, generics) == slv
+    assert dummy_copy.inputs_from_slv(slv, generics) == inputs
+    unresolved = typs.UnresolvedConstrainedSigned(identifier=None, size=4)
+    unresolved_copy = pickle.loads(pickle.dumps(unresolved))
+    assert unresolved_copy.size == 4
+    assert not hasattr(unresolved_copy, 'subtype')
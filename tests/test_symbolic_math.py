@@ -1,4 +1,9 @@
+import pickle
+
+import pytest
+
 from slvcodec import symbolic_math as sm
+from slvcodec import typs
 
 
 def test_substitute():
@@ -47,3 +52,51 @@ def test_simplifications():
         simplified = sm.parse_and_simplify(in_string)
         out_string = sm.str_expression(simplified)
         assert out_string in expected_strings
+
+
+def test_interned_nodes():
+    first = sm.parse_and_simplify('2 * fish + bear * bear')
+    second = sm.parse_and_simplify('bear * bear + 2 * fish')
+    assert first is sm.parse_and_simplify('2 * fish + bear * bear')
+    assert sm.Term(number=2, expression='fish') is sm.Term(number=2, expression='fish')
+    # Nodes of different types with the same items are not equal.
+    assert sm.Term(number=2, expression='fish') != sm.Power(number=2, expression='fish')
+    assert pickle.loads(pickle.dumps(first)) is first
+    sm.simplify.cache_clear()
+    sm.simplify(first)
+    sm.simplify(first)
+    assert sm.simplify.cache_info().hits >= 1
+    assert sm.str_expression(second) in ('(2*fish+bear*bear)', '(bear*bear+2*fish)')
+    # Nodes made before the caches are cleared are equal to new ones.
+    sm.clear_caches()
+    assert not sm.interned_nodes
+    assert sm.simplify.cache_info().currsize == 0
+    third = sm.parse_and_simplify('2 * fish + bear * bear')
+    assert third is not first
+    assert third == first
+    assert hash(third) == hash(first)
+    assert sm.Term(number=2, expression='fish') != sm.Power(number=2, expression='fish')
+
+
+def test_compile_expression():
+    strings = (
+        'fish + 3 * bear * shark / house',
+        'logceil(fish * 4) - 2 * (bear - 1)',
+        'shark / 4 + 1',
+        )
+    values = {'fish': 2, 'bear': 4, 'shark': 3, 'house': 2}
+    for string in strings:
+        simplified = sm.parse_and_simplify(string)
+        compiled = sm.compile_expression(simplified)
+        assert compiled is sm.compile_expression(simplified)
+        expected = sm.get_value(sm.make_substitute_function(values)(simplified))
+        assert compiled(values) == expected
+
+
+def test_compile_missing_generic():
+    compiled = sm.compile_expression(sm.parse_and_simplify('fish + 2 * bear'))
+    assert compiled({'fish': 1, 'bear': 3}) == 7
+    with pytest.raises(sm.ResolutionError) as excinfo:
+        compiled({'fish': 1})
+    assert 'Missing generic bear' in str(excinfo.value)
+    assert typs.ResolutionError is sm.ResolutionError
@@ -0,0 +1,22 @@
+import synthetic_design
+
+from slvcodec import entity
+
+
+def test_synthetic_design(tmpdir):
+    # The same parameters always give the same design.
+    design = synthetic_design.make_design(seed=3, n_records=10, n_ports=12)
+    assert design == synthetic_design.make_design(seed=3, n_records=10, n_ports=12)
+    assert design != synthetic_design.make_design(seed=4, n_records=10, n_ports=12)
+    assert [filename for filename, code in design] == [
+        'synthetic0_pkg.vhd', 'synthetic1_pkg.vhd', 'synthetic_top.vhd']
+    # The design can be processed and the port widths depend on the generics.
+    filenames = synthetic_design.write_design(
+        str(tmpdir), seed=3, n_records=10, n_ports=12)
+    entities, packages = entity.process_files(filenames)
+    assert set(packages.keys()) >= set(['synthetic0_pkg', 'synthetic1_pkg'])
+    top = entities['synthetic_top']
+    assert len(top.ports) == 14
+    narrow = top.codec({'width': 2, 'length': 1})
+    wide = top.codec({'width': 8, 'length': 3})
+    assert narrow.widths['in'] < wide.widths['in']
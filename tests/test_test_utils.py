@@ -0,0 +1,250 @@
+import os
+
+import pytest
+
+from slvcodec import conversions, entity, test_utils
+
+from conftest import StreamingTest, fake_simulation
+
+
+class ListTest(StreamingTest):
+    '''
+    Generates the inputs as a list and checks all the outputs at once.
+    '''
+
+    def make_input_data(self):
+        return list(super().make_input_data())
+
+    def check_output_data(self, input_data, output_data):
+        self.check_output_stream(zip(input_data, output_data))
+        assert self.n_checked == len(input_data) == len(output_data)
+
+
+def test_streaming(tmpdir, dummy_entity):
+    generics = {'length': 3}
+    output_path = str(tmpdir)
+    test = StreamingTest(n_lines=25)
+    pre_config = test_utils.make_pre_config(test, dummy_entity, generics)
+    post_check = test_utils.make_post_check(test, dummy_entity, generics)
+    assert pre_config(output_path)
+    fake_simulation(dummy_entity, generics, output_path)
+    assert post_check(output_path)
+    assert test.n_checked == 25
+
+
+def test_post_check_lists(tmpdir, dummy_entity):
+    generics = {'length': 3}
+    output_path = str(tmpdir)
+    test = ListTest(n_lines=30)
+    assert test_utils.make_pre_config(test, dummy_entity, generics)(output_path)
+    fake_simulation(dummy_entity, generics, output_path)
+    assert test_utils.make_post_check(test, dummy_entity, generics)(output_path)
+    assert test.n_checked == 30
+
+    filename = os.path.join(output_path, 'outdata.dat')
+    with open(filename) as f:
+        expected = [dummy_entity.outputs_from_slv(line, generics) for line in f]
+    assert dummy_entity.outputs_from_lines(filename, generics) == expected
+    with open(filename) as f:
+        assert dummy_entity.outputs_from_lines(f.readlines(), generics, n_workers=2) == expected
+    assert dummy_entity.outputs_from_lines(filename, generics, n_workers=3) == expected
+    test = ListTest(n_lines=30)
+    post_check = test_utils.make_post_check(test, dummy_entity, generics, n_workers=2)
+    assert post_check(output_path)
+    assert test.n_checked == 30
+
+
+def test_input_sidecar(tmpdir, monkeypatch, dummy_entity):
+    generics = {'length': 3}
+    output_path = str(tmpdir)
+    for test_class in (StreamingTest, ListTest):
+        test = test_class(n_lines=25)
+        pre_config = test_utils.make_pre_config(
+            test, dummy_entity, generics, input_sidecar=True)
+        post_check = test_utils.make_post_check(
+            test, dummy_entity, generics, input_sidecar=True)
+        assert pre_config(output_path)
+        fake_simulation(dummy_entity, generics, output_path)
+        with monkeypatch.context() as m:
+            # The inputs should not be decoded.
+            m.setattr(dummy_entity, 'inputs_from_slv', None)
+            m.setattr(dummy_entity, 'inputs_from_lines', None)
+            assert post_check(output_path)
+        assert test.n_checked == 25
+
+
+def test_lazy_outputs(tmpdir, dummy_entity):
+    generics = {'length': 3}
+    output_path = str(tmpdir)
+    test = ListTest(n_lines=20)
+    assert test_utils.make_pre_config(test, dummy_entity, generics)(output_path)
+    fake_simulation(dummy_entity, generics, output_path)
+    filename = os.path.join(output_path, 'outdata.dat')
+    expected = dummy_entity.outputs_from_lines(filename, generics)
+    lazy = dummy_entity.outputs_from_lines(filename, generics, lazy=True)
+    assert all(isinstance(o, entity.LazyPorts) for o in lazy)
+    # Only the ports that are accessed are decoded.
+    assert [o['o_firstdata'] for o in lazy] == [e['o_firstdata'] for e in expected]
+    assert list(lazy[0]._decoded.keys()) == ['o_firstdata']
+    assert list(lazy[0].keys()) == list(expected[0].keys())
+    # The views support the rest of the dictionary interface.
+    assert list(lazy[1].values()) == list(expected[1].values())
+    assert list(lazy[2].items()) == list(expected[2].items())
+    assert dict(lazy[3]) == expected[3]
+    assert lazy == expected
+    with open(filename) as f:
+        line = f.readline()
+    hex_line = dummy_entity.outputs_from_hex(
+        conversions.slv_to_hex(line.strip()), generics, lazy=True)
+    assert hex_line == expected[0]
+    for test_class in (StreamingTest, ListTest):
+        test = test_class(n_lines=20)
+        post_check = test_utils.make_post_check(
+            test, dummy_entity, generics, lazy_outputs=True)
+        assert post_check(output_path)
+        assert test.n_checked == 20
+
+
+def test_byte_ranges(tmpdir):
+    filename = os.path.join(str(tmpdir), 'lines.dat')
+    lines = [str(i) * (i % 7) for i in range(50)] + ['end']
+    test_utils.write_lines(filename, lines)
+    size = os.path.getsize(filename)
+    for n_ranges in (1, 2, 7, 50, size + 10):
+        read = []
+        for start, stop in entity.byte_ranges(size, n_ranges):
+            read += entity.read_byte_range(filename, start, stop)
+        assert [line.rstrip('\n') for line in read] == lines
+
+
+def test_write_lines(tmpdir):
+    filename = os.path.join(str(tmpdir), 'lines.dat')
+    lines = [str(i) for i in range(10)]
+    test_utils.write_lines(filename, iter(lines), chunk_size=3)
+    with open(filename) as f:
+        assert f.read() == '\n'.join(lines)
+    assert [line.strip() for line in test_utils.read_lines(filename)] == lines
+
+
+def test_hex_format(tmpdir, dummy_entity):
+    generics = {'length': 3}
+    output_path = str(tmpdir)
+    test = StreamingTest(n_lines=20)
+    pre_config = test_utils.make_pre_config(
+        test, dummy_entity, generics, hex_format=True)
+    assert pre_config(output_path)
+    with open(os.path.join(output_path, 'indata.dat')) as f:
+        lines = f.read().split('\n')
+    assert len(lines) == 20
+    width = dummy_entity.codec(generics).widths['in']
+    assert all(len(line) < width for line in lines)
+    for index, line in enumerate(lines):
+        decoded = dummy_entity.inputs_from_hex(line, generics)
+        assert decoded['i_datas'] == [index % 64, 0, 0]
+        assert decoded['reset'] is None
+
+
+def test_streaming_short_outputs(tmpdir, dummy_entity):
+    generics = {'length': 3}
+    output_path = str(tmpdir)
+    test = StreamingTest(n_lines=25)
+    assert test_utils.make_pre_config(test, dummy_entity, generics)(output_path)
+    fake_simulation(dummy_entity, generics, output_path)
+    filename = os.path.join(output_path, 'outdata.dat')
+    with open(filename) as f:
+        lines = f.readlines()
+    for n_lines in (10, 0):
+        with open(filename, 'w') as f:
+            f.writelines(lines[:n_lines])
+        test = StreamingTest(n_lines=25)
+        post_check = test_utils.make_post_check(test, dummy_entity, generics)
+        with pytest.raises(Exception) as excinfo:
+            post_check(output_path)
+        assert 'ended after {} lines'.format(n_lines) in str(excinfo.value)
+        assert test.n_checked == n_lines
+
+
+
+class RecordingTest:
+    '''
+    Leaves ports out of the inputs and records the data the check receives.
+    '''
+
+    def make_input_data(self):
+        return [{'i_datas': [index, 0, 0]} for index in range(10)]
+
+    def check_output_data(self, input_data, output_data):
+        self.received = list(zip(input_data, output_data))
+
+
+class StreamRecordingTest(RecordingTest):
+
+    def make_input_data(self):
+        return iter(super().make_input_data())
+
+    def check_output_stream(self, pairs):
+        self.received = list(pairs)
+
+
+def test_input_sidecar_matches_decoded(tmpdir, dummy_entity):
+    generics = {'length': 3}
+    output_path = str(tmpdir)
+    for test_class in (RecordingTest, StreamRecordingTest):
+        received = []
+        for input_sidecar in (False, True):
+            test = test_class()
+            pre_config = test_utils.make_pre_config(
+                test, dummy_entity, generics, input_sidecar=input_sidecar)
+            post_check = test_utils.make_post_check(
+                test, dummy_entity, generics, input_sidecar=input_sidecar)
+            assert pre_config(output_path)
+            fake_simulation(dummy_entity, generics, output_path)
+            assert post_check(output_path)
+            received.append(test.received)
+        assert received[0] == received[1]
+        assert len(received[1]) == 10
+        assert received[1][0][0] == {
+            'reset': None, 'i_valid': None,
+            'i_dummy': {'manydata': [None, None], 'data': None, 'logic': None, 'slv': None},
+            'i_datas': [0, 0, 0]}
+
+
+class ColumnarTest(StreamingTest):
+    '''
+    Generates the inputs as a dictionary of arrays.
+    '''
+
+    def make_input_data(self):
+        numpy = pytest.importorskip('numpy')
+        index = numpy.arange(self.n_lines)
+        return {'i_datas': numpy.stack([index % 64, 0 * index, 0 * index], axis=1)}
+
+
+@pytest.mark.parametrize('n_lines', [20, 0])
+@pytest.mark.parametrize('hex_format,input_sidecar', [
+    (False, False), (True, False), (False, True)])
+def test_columnar_inputs(tmpdir, n_lines, hex_format, input_sidecar, dummy_entity):
+    generics = {'length': 3}
+    output_path = str(tmpdir)
+    test = ColumnarTest(n_lines=n_lines)
+    pre_config = test_utils.make_pre_config(
+        test, dummy_entity, generics, hex_format=hex_format,
+        input_sidecar=input_sidecar)
+    assert pre_config(output_path)
+    with open(os.path.join(output_path, 'indata.dat')) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == n_lines
+    if hex_format:
+        inputs_from_line = dummy_entity.inputs_from_hex
+    else:
+        inputs_from_line = dummy_entity.inputs_from_slv
+    for index, line in enumerate(lines):
+        decoded = inputs_from_line(line, generics)
+        assert decoded['i_datas'] == [index % 64, 0, 0]
+        assert decoded['reset'] is None
+    if not hex_format:
+        fake_simulation(dummy_entity, generics, output_path)
+        post_check = test_utils.make_post_check(
+            test, dummy_entity, generics, input_sidecar=input_sidecar)
+        assert post_check(output_path)
+        assert test.n_checked == n_lines
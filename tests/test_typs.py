@@ -0,0 +1,118 @@
+import pytest
+
+from slvcodec import typs, symbolic_math, conversions
+
+
+def test_resolved_cache():
+    length = typs.Generic(name='length', typ='natural')
+    size = symbolic_math.Multiplication([
+        symbolic_math.Power(number=1, expression=length),
+        symbolic_math.Power(number=1, expression=2),
+        ])
+    cache = typs.ResolvedCache(maxsize=2)
+    assert cache.resolve('size', size, {'length': 3}) == 6
+    assert cache.resolve('size', size, {'length': 4}) == 8
+    assert cache.resolve('size', size, {'length': 3}) == 6
+    # Adding a third value evicts the least recently used one.
+    assert cache.resolve('size', size, {'length': 5}) == 10
+    assert len(cache.values) == 2
+    assert ('size', typs.freeze_generics({'length': 4})) not in cache.values
+    assert ('size', typs.freeze_generics({'length': 3})) in cache.values
+
+    # Frozen generics give the same signature without recalculating it.
+    frozen = typs.FrozenGenerics({'length': 3, 'width': 8})
+    assert frozen == {'length': 3, 'width': 8}
+    assert typs.freeze_generics(frozen) == typs.freeze_generics({'width': 8, 'length': 3})
+    assert cache.resolve('size', size, frozen) == 6
+
+
+def test_generic_width_slv():
+    length = typs.Generic(name='length', typ='natural')
+    typ = typs.ConstrainedUnsigned(identifier=None, size=length)
+    assert typ.to_slv(5, {'length': 4}) == '0101'
+    assert typ.to_slv(5, {'length': 6}) == '000101'
+    assert typ.from_slv('000101', {'length': 6}) == 5
+
+
+def test_slv_metavalues():
+    typ = typs.ConstrainedSigned(identifier=None, size=4)
+    assert typ.to_slv(-3, {}) == '1101'
+    assert typ.from_slv('1101', {}) == -3
+    assert typ.from_slv('01U1', {}) is None
+    assert typ.from_slv('-101', {}) is None
+    wide = typs.ConstrainedStdLogicVector(identifier=None, size=100)
+    value = pow(2, 99) + 5
+    assert wide.from_slv(wide.to_slv(value, {}), {}) == value
+
+
+def test_decode_slv():
+    state = typs.Enumeration('t_state', ['s_idle', 's_busy', 's_done'])
+    word = typs.ConstrainedUnsigned(identifier=None, size=3)
+    inner = typs.Record('t_inner', [('a', typs.std_logic), ('b', word)])
+    array = typs.ConstrainedArray(
+        identifier=None, unconstrained_type=typs.Array('t_inner_array', inner),
+        size=2, constants={})
+    outer = typs.Record('t_outer', [('state', state), ('items', array), ('flag', typs.std_logic)])
+    value = {'state': 's_done', 'items': [{'a': 1, 'b': 6}, {'a': 0, 'b': 3}], 'flag': 0}
+    slv = outer.to_slv(value, {})
+    assert slv == '0' + '0110' + '1101' + '10'
+    assert outer.from_slv(slv, {}) == value
+    # Values are decoded in place from a longer std_logic_vector.  The
+    # position returned is where the next value stops.
+    assert outer.decode_slv('UU' + slv + '111', len(slv) + 2, {}) == (value, 2)
+    assert array.decode_slv(slv, 9, {}) == (value['items'], 1)
+
+
+def test_bulk_array_decode():
+    for width in (1, 5, 8, 16, 32, 64):
+        for signed in (False, True):
+            if signed:
+                subtype = typs.ConstrainedSigned(identifier=None, size=width)
+                values = [-1, 0, subtype.min_value, subtype.max_value]
+            else:
+                subtype = typs.ConstrainedUnsigned(identifier=None, size=width)
+                values = [0, 1, pow(2, width)-1, pow(2, width)//3]
+            typ = typs.ConstrainedArray(
+                identifier=None, unconstrained_type=typs.Array('t_array', subtype),
+                size=len(values), constants={})
+            slv = typ.to_slv(values, {})
+            assert conversions.uint_to_ints(
+                int(slv, 2), len(values), width, signed) == values
+            assert typ.from_slv(slv, {}) == values
+            # Items with metavalues are decoded individually.
+            with_metavalue = slv[:-width] + 'X' + slv[len(slv)-width+1:]
+            assert typ.from_slv(with_metavalue, {}) == [None] + values[1:]
+    bits = typs.StdLogicVector()
+    assert bits.from_slv('0011', {}) == [1, 1, 0, 0]
+    assert bits.from_slv('U011', {}) == [1, 1, 0, None]
+
+
+def test_enumeration_tables():
+    literals = ['S{}'.format(index) for index in range(150)]
+    typ = typs.Enumeration('t_state', literals)
+    assert typ.width == 8
+    assert typ.to_slv('S5', {}) == typ.to_slv('s5', {}) == '00000101'
+    assert typ.from_slv('00000101', {}) == 's5'
+    assert typ.from_slv('10010101', {}) == 's149'
+    # Codes that are out of range or contain metavalues decode to None.
+    assert typ.from_slv('10010110', {}) is None
+    assert typ.from_slv('0000U101', {}) is None
+    with pytest.raises(Exception):
+        typ.to_slv('s150', {})
+
+
+def test_hex_conversion():
+    for slv in ('', '1', '10110', '0000000011111', 'UUUUU', '01U10X1-0', 'ZZZZ0101'):
+        hex_string = conversions.slv_to_hex(slv)
+        assert len(hex_string.replace('#', '')) <= len(slv)
+        assert conversions.hex_to_slv(hex_string, len(slv)) == slv
+    assert conversions.slv_to_hex('10110') == '16'
+    assert conversions.slv_to_hex('UUUUU') == 'UU'
+    assert conversions.slv_to_hex('01U10X1-0') == '0#1U10#X1-0'
+
+
+def test_reduce_slv():
+    length = typs.Generic(name='length', typ='natural')
+    typ = typs.ConstrainedUnsigned(identifier=None, size=length)
+    assert typ.reduce_slv('11000101', {'length': 4}) == (5, '1100')
+    assert typs.std_logic.reduce_slv('1100', {}) == (0, '110')